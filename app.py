@@ -1,6 +1,7 @@
 # Main Flask Application - Entry Point
 # Unified backend service with modular structure
 import os
+import re
 from flask import Flask, jsonify, request
 from flask_cors import CORS
 
@@ -26,13 +27,18 @@ if allowed_origins == '*':
     origins_list = '*'
 else:
     origins_list = [origin.strip() for origin in allowed_origins.split(',')]
+    # Always allow local dev servers on any port
+    origins_list.append(re.compile(r'^https?://(localhost|127\.0\.0\.1)(:\d+)?$'))
+
+# Let browsers cache preflight results for 24h so repeated POSTs skip OPTIONS
+CORS_MAX_AGE = 86400
 
 CORS(app, resources={r"/*": {
     "origins": origins_list,
-    "allow_headers": ["Content-Type", "Authorization", "Accept", "X-Requested-With"],
+    "allow_headers": ["Content-Type", "Authorization", "Accept", "X-Requested-With", "X-Filename", "X-Is-Video"],
     "expose_headers": ["Content-Disposition"],
     "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-    "max_age": 3600,
+    "max_age": CORS_MAX_AGE,
     "supports_credentials": False
 }})
 
@@ -40,30 +46,13 @@ CORS(app, resources={r"/*": {
 app.config["MAX_CONTENT_LENGTH"] = 500 * 1024 * 1024
 
 
-# Add CORS headers to all responses (ensures preflight requests are handled)
-@app.after_request
-def after_request(response):
-    """Ensure CORS headers are present on all responses, including OPTIONS"""
-    origin = request.headers.get('Origin')
-    
-    # Set Access-Control-Allow-Origin header
-    if origin:
-        if origins_list == '*':
-            response.headers['Access-Control-Allow-Origin'] = '*'
-        elif isinstance(origins_list, list) and origin in origins_list:
-            response.headers['Access-Control-Allow-Origin'] = origin
-        else:
-            # Fallback: allow localhost origins in development
-            if 'localhost' in origin or '127.0.0.1' in origin:
-                response.headers['Access-Control-Allow-Origin'] = origin
-    
-    # Set other CORS headers
-    response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization, Accept, X-Requested-With'
-    response.headers['Access-Control-Allow-Methods'] = 'GET, POST, PUT, DELETE, OPTIONS'
-    response.headers['Access-Control-Expose-Headers'] = 'Content-Disposition'
-    response.headers['Access-Control-Max-Age'] = '3600'
-    
-    return response
+# Answer preflight requests before blueprint dispatch (no view code runs)
+@app.before_request
+def short_circuit_preflight():
+    """Return an empty 204 for OPTIONS; flask-cors adds the headers on the way out"""
+    if request.method == 'OPTIONS':
+        return '', 204
+
 
 # Register blueprints - All endpoints keep their original paths
 # No URL prefix to maintain backward compatibility
@@ -75,6 +64,11 @@ app.register_blueprint(conversion_bp)
 app.register_blueprint(qr_bp)
 app.register_blueprint(placeholder_bp)
 
+# Routes import their heavy modules lazily on first use. With WARMUP=1 (and
+# gunicorn --preload) pay that once in the master process instead.
+if os.environ.get('WARMUP') == '1':
+    import audioextractor  # noqa: F401  (warms itself up on import)
+
 
 @app.route('/', methods=['GET'])
 def index():
@@ -95,10 +89,13 @@ def index():
             ],
             "video": [
                 "/video-upscale",
-                "/download-video-batch"
+                "/download-video-batch",
+                "/download-video-batch/stream",
+                "/downloads/<token>"
             ],
             "audio": [
-                "/download-audio-batch"
+                "/download-audio-batch",
+                "/download-audio-batch-stream"
             ],
             "pdf": [
                 "/protect-pdf",
@@ -165,10 +162,13 @@ if __name__ == '__main__':
     print("=" * 60)
     
     # Run the app
+    # This is the Werkzeug development server - production runs under gunicorn
+    # (see Procfile / Dockerfile). Set DEV_SERVER=1 to enable the debugger/reloader.
     # Use 0.0.0.0 to allow external connections (required for Railway/Render)
-    # Debug mode OFF in production, ON in development
+    dev_server = os.environ.get('DEV_SERVER') == '1'
     app.run(
         host='0.0.0.0',  # Changed from 127.0.0.1 to allow external access
         port=port,       # Use environment PORT variable
-        debug=not is_production  # False in production, True in development
+        debug=dev_server and not is_production,
+        threaded=True    # Don't serialize requests when run directly
     )
@@ -1,30 +1,28 @@
-from flask import Flask, request, send_file, jsonify
+from flask import Flask, Response, request, send_file, jsonify
 from flask_cors import CORS
 import yt_dlp
+from yt_dlp.postprocessor import FFmpegExtractAudioPP
 import os
-import zipfile
 import tempfile
 import shutil
 from pathlib import Path
 import concurrent.futures
 import docx
-import PyPDF2
+try:
+    import pypdf
+except ImportError:  # older installs only have the legacy package name
+    import PyPDF2 as pypdf
 import re
 import sys
 import subprocess
+import queue
+import threading
+import hashlib
+import time
 
-# Lazy import for heavy library - loaded only when needed
-_VideoFileClip = None
+from utils.helpers import stream_zip
 
-def _ensure_moviepy():
-    """Lazy load moviepy only when needed"""
-    global _VideoFileClip
-    if _VideoFileClip is None:
-        from moviepy.editor import VideoFileClip
-        _VideoFileClip = VideoFileClip
-    return _VideoFileClip
-
-def find_ffmpeg():
+def _find_ffmpeg_impl():
     """Find FFmpeg executable path - works on Windows, Linux, and macOS"""
     import shutil
     
@@ -48,6 +46,19 @@ def find_ffmpeg():
     
     return None
 
+# Probed once at import; the answer doesn't change between requests
+_FFMPEG_PATH = _find_ffmpeg_impl()
+
+def find_ffmpeg():
+    """Return the cached FFmpeg path (see refresh_ffmpeg to re-probe)"""
+    return _FFMPEG_PATH
+
+def refresh_ffmpeg():
+    """Re-probe for FFmpeg, e.g. after installing it while the server is running"""
+    global _FFMPEG_PATH
+    _FFMPEG_PATH = _find_ffmpeg_impl()
+    return _FFMPEG_PATH
+
 def verify_ffmpeg():
     """Verify FFmpeg is available and log its location"""
     ffmpeg_path = find_ffmpeg()
@@ -65,55 +76,328 @@ CORS(app, resources={r"/*": {"origins": "http://localhost:4200"}})
 # Temporary directory for downloads
 TEMP_DIR = tempfile.gettempdir()
 
+# Shared pool for yt-dlp downloads. The work is network-bound, so one
+# process-wide pool serves all requests instead of spinning up (and tearing
+# down) a small pool per request.
+AUDIO_BATCH_WORKERS = int(os.environ.get('AUDIO_BATCH_WORKERS', min(32, (os.cpu_count() or 4) * 4)))
+_DOWNLOAD_POOL = concurrent.futures.ThreadPoolExecutor(max_workers=AUDIO_BATCH_WORKERS, thread_name_prefix='audio_dl')
+
+# FFmpeg encodes are CPU-bound; cap them at one per core so a wide download
+# pool doesn't oversubscribe the CPU once downloads finish
+_ENCODE_SLOTS = threading.Semaphore(os.cpu_count() or 1)
+
+class _GatedExtractAudioPP(FFmpegExtractAudioPP):
+    """FFmpegExtractAudio that waits for a free encode slot"""
+    def run(self, information):
+        with _ENCODE_SLOTS:
+            return super().run(information)
+
+# Temp trees can be hundreds of MB; delete them off the request thread
+_CLEANUP_EXECUTOR = concurrent.futures.ThreadPoolExecutor(max_workers=2, thread_name_prefix='cleanup')
+
+def _discard_dir(path):
+    """Rename a temp dir out of the way and delete it in the background."""
+    trash = path + '.trash'
+    try:
+        os.rename(path, trash)
+    except OSError:
+        trash = path
+    _CLEANUP_EXECUTOR.submit(shutil.rmtree, trash, ignore_errors=True)
+
+# Buffer size for cross-filesystem copies (shutil's default is far smaller)
+COPY_BUFFER_SIZE = 4 * 1024 * 1024
+
+# Chunk size for streamed request/response bodies
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+def _move_file(src, dst):
+    """Rename src to dst, falling back to a large-buffer copy across filesystems."""
+    try:
+        os.replace(src, dst)
+    except OSError:
+        with open(src, 'rb') as s, open(dst, 'wb') as d:
+            shutil.copyfileobj(s, d, length=COPY_BUFFER_SIZE)
+        os.unlink(src)
+
+def _link_or_copy(src, dst):
+    """Hard-link src to dst (replacing dst), falling back to a copy."""
+    tmp = f"{dst}.{os.urandom(4).hex()}.part"
+    try:
+        os.link(src, tmp)
+    except OSError:
+        with open(src, 'rb') as s, open(tmp, 'wb') as d:
+            shutil.copyfileobj(s, d, length=COPY_BUFFER_SIZE)
+    os.replace(tmp, dst)
+
+# On-disk cache of finished downloads keyed by URL, so resubmitted links are
+# a local link/copy instead of a fresh download + transcode.
+# Opt-in: set AUDIO_CACHE_DIR to a directory to enable it.
+AUDIO_CACHE_DIR = os.environ.get('AUDIO_CACHE_DIR', '')
+AUDIO_CACHE_TTL = int(os.environ.get('AUDIO_CACHE_TTL', 24 * 3600))
+AUDIO_CACHE_MAX_BYTES = int(os.environ.get('AUDIO_CACHE_MAX_BYTES', 20 * 1024 ** 3))
+# Size-cap eviction scans the whole cache; run it at most this often (seconds)
+AUDIO_CACHE_EVICT_INTERVAL = int(os.environ.get('AUDIO_CACHE_EVICT_INTERVAL', 300))
+_cache_evict_lock = threading.Lock()
+_cache_last_evict = 0.0
+
+def _cache_entry_dir(url):
+    return os.path.join(AUDIO_CACHE_DIR, hashlib.sha256(url.strip().encode('utf-8')).hexdigest())
+
+def _cache_get(url):
+    """Cached audio file for url, or None if missing/expired."""
+    if not AUDIO_CACHE_DIR:
+        return None
+    entry = _cache_entry_dir(url)
+    try:
+        if time.time() - os.path.getmtime(entry) > AUDIO_CACHE_TTL:
+            _discard_dir(entry)
+            return None
+        names = os.listdir(entry)
+    except OSError:
+        return None
+    if not names:
+        return None
+    path = os.path.join(entry, names[0])
+    # Bump the file's atime/mtime so eviction is least-recently-used
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return path
+
+def _cache_put(url, path):
+    """Store a finished download for url. Failures are logged and ignored."""
+    if not AUDIO_CACHE_DIR:
+        return
+    entry = _cache_entry_dir(url)
+    staging = f"{entry}.{os.urandom(4).hex()}.tmp"
+    try:
+        os.makedirs(staging)
+        _link_or_copy(path, os.path.join(staging, os.path.basename(path)))
+        if os.path.exists(entry):
+            _discard_dir(entry)
+        os.rename(staging, entry)
+    except OSError as e:
+        print(f"[WARNING] Could not cache audio for {url}: {e}")
+        shutil.rmtree(staging, ignore_errors=True)
+        return
+    _schedule_cache_evict()
+
+def _schedule_cache_evict():
+    """Queue _cache_evict unless it ran within AUDIO_CACHE_EVICT_INTERVAL."""
+    global _cache_last_evict
+    with _cache_evict_lock:
+        now = time.monotonic()
+        if _cache_last_evict and now - _cache_last_evict < AUDIO_CACHE_EVICT_INTERVAL:
+            return
+        _cache_last_evict = now
+    _CLEANUP_EXECUTOR.submit(_cache_evict)
+
+def _cache_evict():
+    """Drop the least recently used entries until the cache fits its size cap."""
+    entries = []
+    total = 0
+    for entry in os.scandir(AUDIO_CACHE_DIR):
+        if not entry.is_dir() or entry.name.endswith(('.tmp', '.trash')):
+            continue
+        try:
+            for f in os.scandir(entry.path):
+                st = f.stat()
+                entries.append((st.st_mtime, st.st_size, entry.path))
+                total += st.st_size
+        except OSError:
+            continue
+    entries.sort()
+    for _, size, path in entries:
+        if total <= AUDIO_CACHE_MAX_BYTES:
+            break
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+
+if AUDIO_CACHE_DIR:
+    os.makedirs(AUDIO_CACHE_DIR, exist_ok=True)
+
+# Compiled once; both are hit for every URL / file in a batch
+_URL_RE = re.compile(r'https?://[^\s<>"{}|\\^`\[\]]+')
+_BAD_FN_RE = re.compile(r'[<>:"/\\|?*]')
+
+# Audio formats we hand back, and their MIME types
+_AUDIO_MIMETYPES = {
+    '.m4a': 'audio/mp4',
+    '.mp4': 'audio/mp4',
+    '.mp3': 'audio/mpeg',
+    '.opus': 'audio/opus',
+    '.webm': 'audio/webm',
+    '.ogg': 'audio/ogg',
+    '.aac': 'audio/aac',
+    '.wav': 'audio/wav',
+}
+_AUDIO_EXTS = tuple(_AUDIO_MIMETYPES)
+
+def _reserve_path(output_dir, filename):
+    """
+    Atomically claim a unique path in output_dir for filename.
+    Keeps the name as-is when free, otherwise lets mkstemp pick a unique
+    variant; either way concurrent callers can't be handed the same path.
+    """
+    path = os.path.join(output_dir, filename)
+    try:
+        os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        return path
+    except FileExistsError:
+        base_name, ext = os.path.splitext(filename)
+        fd, path = tempfile.mkstemp(prefix=f"{base_name}_", suffix=ext, dir=output_dir)
+        os.close(fd)
+        return path
+
 def extract_urls_from_text(text):
-    """Extract URLs from text content."""
-    url_pattern = r'https?://[^\s<>"{}|\\^`\[\]]+'
-    urls = re.findall(url_pattern, text)
+    """
+    Extract unique URLs from text content, in order of first appearance.
+    Returns a dict used as an ordered set (values are None) so callers can
+    merge results with dict.update() in O(1) per URL.
+    """
+    seen = {}
+    for url in _URL_RE.findall(text):
+        url = url.strip()
+        if url:
+            seen.setdefault(url, None)
     
-    # Also split by lines and clean
-    lines = text.strip().split('\n')
-    for line in lines:
+    # Also pick up whole lines that are URLs
+    for line in text.splitlines():
         line = line.strip()
-        if line and (line.startswith('http://') or line.startswith('https://')):
-            if line not in urls:
-                urls.append(line)
+        if line.startswith(('http://', 'https://')):
+            seen.setdefault(line, None)
     
-    return [url.strip() for url in urls if url.strip()]
+    return seen
 
 def extract_urls_from_docx(file_path):
-    """Extract URLs from DOCX file."""
+    """Extract URLs from DOCX file (ordered dict, see extract_urls_from_text)."""
     try:
         doc = docx.Document(file_path)
         text = '\n'.join([paragraph.text for paragraph in doc.paragraphs])
         return extract_urls_from_text(text)
     except Exception as e:
         print(f"Error reading DOCX: {e}")
-        return []
+        return {}
 
 def extract_urls_from_pdf(file_path):
-    """Extract URLs from PDF file."""
+    """Extract URLs from PDF file (ordered dict, see extract_urls_from_text)."""
     try:
-        urls = []
+        urls = {}
         with open(file_path, 'rb') as file:
-            pdf_reader = PyPDF2.PdfReader(file)
+            pdf_reader = pypdf.PdfReader(file, strict=False)
             for page in pdf_reader.pages:
                 text = page.extract_text()
                 if text:
-                    urls.extend(extract_urls_from_text(text))
+                    urls.update(extract_urls_from_text(text))
         return urls
     except Exception as e:
         print(f"Error reading PDF: {e}")
-        return []
+        return {}
 
 def sanitize_filename(filename):
     """Remove invalid characters from filename."""
     # Remove invalid characters for Windows/Unix filesystems
-    invalid_chars = r'[<>:"/\\|?*]'
-    sanitized = re.sub(invalid_chars, '_', filename)
+    sanitized = _BAD_FN_RE.sub('_', filename)
     # Remove leading/trailing spaces and dots
     sanitized = sanitized.strip('. ')
     return sanitized if sanitized else 'audio'
 
+def _build_ydl_opts():
+    """Shared yt-dlp options; the output template is set per download."""
+    # yt-dlp options for audio extraction
+    # Strategy: If FFmpeg available, extract and convert. If not, download best audio as-is.
+    ydl_opts = {
+        # Format selector: Get best audio quality available
+        'format': 'bestaudio/best',
+        # Replaced per download with that download's directory
+        'outtmpl': {'default': '%(title)s.%(ext)s'},
+        'quiet': False,
+        'no_warnings': False,
+        'extract_flat': False,
+        # Universal settings that work across all platforms
+        'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+        'nocheckcertificate': True,
+        # Retries for better reliability
+        'retries': 10,
+        'fragment_retries': 10,
+        'skip_unavailable_fragments': True,
+        # Platform-specific optimizations (applied only when needed)
+        'extractor_args': {
+            'youtube': {
+                'player_client': ['android', 'web'],
+            },
+            'instagram': {
+                'username': None,  # Can be configured if needed
+                'password': None,
+            }
+        },
+        # HTTP headers for better compatibility
+        'http_headers': {
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+            'Accept-Language': 'en-us,en;q=0.5',
+            'Sec-Fetch-Mode': 'navigate',
+        },
+    }
+    
+    # Configure FFmpeg-based processing if available
+    # (the extract-audio postprocessor itself is attached in _acquire_ydl)
+    if _FFMPEG_PATH:
+        ydl_opts['ffmpeg_location'] = _FFMPEG_PATH
+        print(f"[DEBUG] Using FFmpeg at: {_FFMPEG_PATH} for audio conversion")
+    else:
+        # No FFmpeg - download audio in native format (no conversion)
+        print("[WARNING] FFmpeg not found - downloading audio in native format (no conversion)")
+        # No postprocessors - just download the audio stream as-is
+    
+    return ydl_opts
+
+# Idle YoutubeDL instances. Building one re-parses the options and
+# registers every extractor, so instances are reused across downloads.
+# Each is only ever used by one thread at a time.
+_YDL_POOL = queue.Queue()
+
+def _acquire_ydl():
+    try:
+        return _YDL_POOL.get_nowait()
+    except queue.Empty:
+        pass
+    ydl = yt_dlp.YoutubeDL(_build_ydl_opts())
+    if _FFMPEG_PATH:
+        # FFmpeg is available - extract and convert to M4A
+        ydl.add_post_processor(_GatedExtractAudioPP(
+            ydl,
+            preferredcodec='m4a',
+            preferredquality='192',
+            nopostoverwrites=False,
+        ))
+    return ydl
+
+def _release_ydl(ydl):
+    _YDL_POOL.put(ydl)
+
+def _downloaded_path(ydl, info, download_dir):
+    """
+    Path of the finished (post-processed) file for an extract_info result.
+    yt-dlp reports it directly; the directory scan is only a fallback.
+    """
+    if not info:
+        return None
+    
+    requested = info.get('requested_downloads')
+    if requested and requested[0].get('filepath'):
+        path = requested[0]['filepath']
+    else:
+        path = ydl.prepare_filename(info)
+    if os.path.exists(path):
+        return path
+    
+    # Look for common audio formats
+    for f in os.listdir(download_dir):
+        if f.endswith(_AUDIO_EXTS):
+            return os.path.join(download_dir, f)
+    return None
+
 def download_audio(url, output_dir):
     """
     Download audio from a video URL using yt-dlp.
@@ -121,100 +405,49 @@ def download_audio(url, output_dir):
     Returns the path to the downloaded audio file or None if failed.
     """
     try:
+        cached = _cache_get(url)
+        if cached:
+            final_path = _reserve_path(output_dir, os.path.basename(cached))
+            try:
+                _link_or_copy(cached, final_path)
+                print(f"Audio served from cache: {os.path.basename(final_path)}")
+                return final_path
+            except OSError:
+                # Evicted since the lookup: treat it as a miss
+                try:
+                    os.unlink(final_path)
+                except OSError:
+                    pass
+        
         # Create a unique subdirectory for this download
         download_id = os.urandom(8).hex()
         download_dir = os.path.join(output_dir, download_id)
         os.makedirs(download_dir, exist_ok=True)
         
-        # Find FFmpeg location
-        ffmpeg_location = find_ffmpeg()
-        
-        # yt-dlp options for audio extraction
-        # Strategy: If FFmpeg available, extract and convert. If not, download best audio as-is.
-        ydl_opts = {
-            # Format selector: Get best audio quality available
-            'format': 'bestaudio/best',
-            'outtmpl': os.path.join(download_dir, '%(title)s.%(ext)s'),
-            'quiet': False,
-            'no_warnings': False,
-            'extract_flat': False,
-            # Universal settings that work across all platforms
-            'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'nocheckcertificate': True,
-            # Retries for better reliability
-            'retries': 10,
-            'fragment_retries': 10,
-            'skip_unavailable_fragments': True,
-            # Platform-specific optimizations (applied only when needed)
-            'extractor_args': {
-                'youtube': {
-                    'player_client': ['android', 'web'],
-                },
-                'instagram': {
-                    'username': None,  # Can be configured if needed
-                    'password': None,
-                }
-            },
-            # HTTP headers for better compatibility
-            'http_headers': {
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-                'Accept-Language': 'en-us,en;q=0.5',
-                'Sec-Fetch-Mode': 'navigate',
-            },
-        }
-        
-        # Configure FFmpeg-based processing if available
-        if ffmpeg_location:
-            # FFmpeg is available - extract and convert to M4A
-            ydl_opts['postprocessors'] = [{
-                'key': 'FFmpegExtractAudio',
-                'preferredcodec': 'm4a',
-                'preferredquality': '192',
-                'nopostoverwrites': False,
-            }]
-            ydl_opts['ffmpeg_location'] = ffmpeg_location
-            print(f"[DEBUG] Using FFmpeg at: {ffmpeg_location} for audio conversion")
-        else:
-            # No FFmpeg - download audio in native format (no conversion)
-            print("[WARNING] FFmpeg not found - downloading audio in native format (no conversion)")
-            # No postprocessors - just download the audio stream as-is
-        
         print(f"Downloading audio from: {url}")
         
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        ydl = _acquire_ydl()
+        try:
+            ydl.params['outtmpl']['default'] = os.path.join(download_dir, '%(title)s.%(ext)s')
             info = ydl.extract_info(url, download=True)
+            original_path = _downloaded_path(ydl, info, download_dir)
+        finally:
+            _release_ydl(ydl)
+        
+        if original_path:
+            # Sanitize filename and move to output_dir
+            safe_filename = sanitize_filename(os.path.basename(original_path))
+            final_path = _reserve_path(output_dir, safe_filename)
+            safe_filename = os.path.basename(final_path)
             
-            # Get the actual filename
-            if info:
-                # The output file will be in the download_dir
-                files = os.listdir(download_dir)
-                
-                # Look for common audio formats
-                audio_extensions = ['.m4a', '.opus', '.webm', '.mp3', '.aac', '.ogg', '.wav', '.mp4']
-                audio_files = [f for f in files if any(f.endswith(ext) for ext in audio_extensions)]
-                
-                if audio_files:
-                    original_path = os.path.join(download_dir, audio_files[0])
-                    
-                    # Sanitize filename and move to output_dir
-                    safe_filename = sanitize_filename(audio_files[0])
-                    final_path = os.path.join(output_dir, safe_filename)
-                    
-                    # Handle duplicate filenames
-                    counter = 1
-                    base_name, ext = os.path.splitext(safe_filename)
-                    while os.path.exists(final_path):
-                        safe_filename = f"{base_name}_{counter}{ext}"
-                        final_path = os.path.join(output_dir, safe_filename)
-                        counter += 1
-                    
-                    shutil.move(original_path, final_path)
-                    
-                    # Clean up download directory
-                    shutil.rmtree(download_dir, ignore_errors=True)
-                    
-                    print(f"Audio extracted successfully: {safe_filename}")
-                    return final_path
+            _move_file(original_path, final_path)
+            _cache_put(url, final_path)
+            
+            # Clean up download directory
+            shutil.rmtree(download_dir, ignore_errors=True)
+            
+            print(f"Audio extracted successfully: {safe_filename}")
+            return final_path
         
         # Clean up if no file was found
         shutil.rmtree(download_dir, ignore_errors=True)
@@ -230,70 +463,109 @@ def download_audio(url, output_dir):
             shutil.rmtree(download_dir, ignore_errors=True)
         return None
 
+def _mp3_extract_cmd(video_path, output):
+    """FFmpeg command that drops video/subtitle/data streams and encodes audio to MP3"""
+    return [
+        _FFMPEG_PATH, '-y', '-hide_banner', '-loglevel', 'error',
+        '-i', video_path,
+        '-vn', '-sn', '-dn',
+        '-acodec', 'libmp3lame', '-b:a', '192k',
+        '-f', 'mp3', output,
+    ]
+
+def _stream_audio_from_video(video_path):
+    """
+    Transcode a video's audio track to MP3 on ffmpeg's stdout and stream it
+    as the response body, so the audio never touches disk.
+    Returns None (after removing the video) if ffmpeg produced no output.
+    Not gated on _ENCODE_SLOTS: ffmpeg runs at the client's read pace, so
+    slow or stalled clients would hold slots the batch encodes need. The
+    number of these is already bounded by the server's request threads.
+    """
+    proc = subprocess.Popen(
+        _mp3_extract_cmd(video_path, 'pipe:1'),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+    
+    # Wait for the first chunk so a missing audio track or a bad input can
+    # still be reported as an error instead of an empty 200
+    first_chunk = proc.stdout.read(STREAM_CHUNK_SIZE)
+    
+    def cleanup():
+        if proc.poll() is None:
+            proc.kill()
+        proc.stdout.close()
+        proc.wait()
+        try:
+            os.unlink(video_path)
+        except OSError:
+            pass
+    
+    if not first_chunk:
+        cleanup()
+        print(f"[ERROR] FFmpeg produced no audio for: {video_path}")
+        return None
+    
+    def generate():
+        yield first_chunk
+        while True:
+            chunk = proc.stdout.read(STREAM_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+    
+    filename = f"{sanitize_filename(Path(video_path).stem)}.mp3"
+    response = Response(
+        generate(),
+        mimetype='audio/mpeg',
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+    response.call_on_close(cleanup)
+    return response
+
 def extract_audio_from_video(video_path, output_dir):
     """
-    Extract audio from an uploaded video file using MoviePy.
+    Extract audio from an uploaded video file with a direct FFmpeg call.
     Returns the path to the extracted audio file or None if failed.
     """
     try:
-        # Lazy load moviepy
-        VideoFileClip = _ensure_moviepy()
+        if not _FFMPEG_PATH:
+            print("[ERROR] FFmpeg not found - cannot extract audio from video files")
+            return None
         
         print(f"[DEBUG] Starting audio extraction from video: {video_path}")
-        print(f"[DEBUG] Video file exists: {os.path.exists(video_path)}")
         print(f"[DEBUG] Video file size: {os.path.getsize(video_path)} bytes")
         
-        # Load video file
-        try:
-            video = VideoFileClip(video_path)
-            print(f"[DEBUG] Video loaded successfully. Duration: {video.duration}s")
-        except Exception as load_error:
-            print(f"[ERROR] Failed to load video file: {load_error}")
-            print(f"[ERROR] This might be due to missing FFmpeg or unsupported codec")
-            raise
-        
         # Get original filename without extension
         original_name = Path(video_path).stem
         safe_filename = sanitize_filename(original_name)
         
         # Output audio as MP3 (widely compatible format)
-        audio_filename = f"{safe_filename}.mp3"
-        audio_path = os.path.join(output_dir, audio_filename)
-        
-        # Handle duplicate filenames
-        counter = 1
-        while os.path.exists(audio_path):
-            audio_filename = f"{safe_filename}_{counter}.mp3"
-            audio_path = os.path.join(output_dir, audio_filename)
-            counter += 1
+        audio_path = _reserve_path(output_dir, f"{safe_filename}.mp3")
+        audio_filename = os.path.basename(audio_path)
         
         print(f"[DEBUG] Output audio path: {audio_path}")
         
-        # Extract audio
-        if video.audio is not None:
-            print(f"[DEBUG] Audio track found, extracting...")
-            try:
-                # Use libmp3lame codec (more compatible than 'mp3')
-                video.audio.write_audiofile(
-                    audio_path, 
-                    codec='libmp3lame',
-                    bitrate='192k',
-                    verbose=False, 
-                    logger=None
-                )
-                video.close()
-                print(f"[SUCCESS] Audio extracted successfully: {audio_filename}")
-                print(f"[DEBUG] Output file size: {os.path.getsize(audio_path)} bytes")
-                return audio_path
-            except Exception as write_error:
-                video.close()
-                print(f"[ERROR] Failed to write audio file: {write_error}")
-                print(f"[ERROR] Make sure FFmpeg is installed and accessible")
-                raise
-        else:
-            video.close()
-            print(f"[WARNING] No audio track found in video: {video_path}")
+        with _ENCODE_SLOTS:
+            result = subprocess.run(
+                _mp3_extract_cmd(video_path, audio_path),
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+            )
+        if result.returncode != 0:
+            stderr = result.stderr.decode('utf-8', errors='replace').strip()
+            if os.path.exists(audio_path):
+                os.unlink(audio_path)
+            if 'does not contain any stream' in stderr:
+                print(f"[WARNING] No audio track found in video: {video_path}")
+            else:
+                print(f"[ERROR] FFmpeg failed to extract audio: {stderr}")
             return None
+        
+        print(f"[SUCCESS] Audio extracted successfully: {audio_filename}")
+        print(f"[DEBUG] Output file size: {os.path.getsize(audio_path)} bytes")
+        return audio_path
             
     except Exception as e:
         print(f"[ERROR] Error extracting audio from video {video_path}: {e}")
@@ -304,19 +576,158 @@ def extract_audio_from_video(video_path, output_dir):
 def get_audio_mimetype(filename):
     """Get MIME type based on file extension."""
     ext = Path(filename).suffix.lower()
-    mimetypes = {
-        '.m4a': 'audio/mp4',
-        '.mp4': 'audio/mp4',
-        '.mp3': 'audio/mpeg',
-        '.opus': 'audio/opus',
-        '.webm': 'audio/webm',
-        '.ogg': 'audio/ogg',
-        '.aac': 'audio/aac',
-        '.wav': 'audio/wav',
-    }
-    return mimetypes.get(ext, 'audio/mpeg')
+    return _AUDIO_MIMETYPES.get(ext, 'audio/mpeg')
+
+# Uploaded video files are transcoded locally; anything else must be a link list
+VIDEO_EXTENSIONS = ['.mp4', '.mov', '.avi', '.mkv', '.webm', '.flv', '.wmv', '.m4v']
+
+def _sources_from_file(file_path, file_ext):
+    """
+    Turn a saved upload into (urls, video_files).
+    Video files are kept for extraction; link files are parsed and removed.
+    Raises ValueError for unsupported file types.
+    """
+    seen = {}
+    video_files = []
+    
+    if file_ext in VIDEO_EXTENSIONS:
+        # It's a video file - add to video_files list
+        print(f"[DEBUG] Detected as video file, adding to processing queue")
+        video_files.append(file_path)
+        return [], video_files
+    
+    try:
+        if file_ext == '.txt':
+            with open(file_path, 'r', encoding='utf-8') as f:
+                seen.update(extract_urls_from_text(f.read()))
+        elif file_ext == '.docx':
+            seen.update(extract_urls_from_docx(file_path))
+        elif file_ext == '.pdf':
+            seen.update(extract_urls_from_pdf(file_path))
+        else:
+            raise ValueError(f'Unsupported file type: {file_ext}')
+    finally:
+        # Clean up temp file
+        os.unlink(file_path)
+    
+    return list(seen), video_files
+
+
+def _process_sources(urls, video_files):
+    """Download/extract audio for the collected sources and build the response."""
+    if not urls and not video_files:
+        return jsonify({'error': 'No valid URLs or video files found'}), 400
+    
+    print(f"Found {len(urls)} URL(s) and {len(video_files)} video file(s) to process")
+    
+    # Single local video: pipe ffmpeg's output straight to the client
+    if not urls and len(video_files) == 1 and _FFMPEG_PATH:
+        response = _stream_audio_from_video(video_files[0])
+        if response is not None:
+            return response
+        return jsonify({'error': 'Failed to extract audio from any of the provided sources'}), 500
+    
+    # Create temporary directory for downloads
+    temp_download_dir = tempfile.mkdtemp(prefix='audio_download_', dir=TEMP_DIR)
+    
+    try:
+        # Download audio files (with parallel processing for multiple URLs)
+        audio_files = []
+        
+        # Process video files first
+        for video_file in video_files:
+            audio_path = extract_audio_from_video(video_file, temp_download_dir)
+            if audio_path:
+                audio_files.append(audio_path)
+            # Clean up the temporary video file
+            try:
+                os.unlink(video_file)
+            except:
+                pass
+        
+        # Process URLs (downloads run concurrently on the shared pool)
+        if urls:
+            future_to_url = {_DOWNLOAD_POOL.submit(download_audio, url, temp_download_dir): url for url in urls}
+            
+            for future in concurrent.futures.as_completed(future_to_url):
+                url = future_to_url[future]
+                try:
+                    audio_path = future.result()
+                    if audio_path:
+                        audio_files.append(audio_path)
+                except Exception as e:
+                    print(f"Error processing {url}: {e}")
+        
+        if not audio_files:
+            shutil.rmtree(temp_download_dir, ignore_errors=True)
+            return jsonify({'error': 'Failed to extract audio from any of the provided sources'}), 500
+        
+        # If single audio file, return it directly
+        if len(audio_files) == 1:
+            audio_file = audio_files[0]
+            filename = os.path.basename(audio_file)
+            mimetype = get_audio_mimetype(filename)
+            
+            # conditional=True adds Range/If-Modified-Since support (resumable
+            # downloads); the body goes out via wsgi.file_wrapper/sendfile
+            response = send_file(
+                audio_file,
+                as_attachment=True,
+                download_name=filename,
+                mimetype=mimetype,
+                conditional=True,
+                etag=True,
+                last_modified=os.path.getmtime(audio_file)
+            )
+            
+            # Schedule cleanup after sending
+            @response.call_on_close
+            def cleanup():
+                _discard_dir(temp_download_dir)
+            
+            return response
+        
+        # Multiple audio files - stream a ZIP straight to the client.
+        # Audio is already compressed, so entries are STORED (no DEFLATE pass).
+        zip_filename = f'audio_files_{len(audio_files)}_files.zip'
+        entries = [(f, os.path.basename(f)) for f in audio_files]
+        
+        response = Response(
+            stream_zip(entries),
+            mimetype='application/zip',
+            headers={'Content-Disposition': f'attachment; filename={zip_filename}'}
+        )
+        
+        # Schedule cleanup after sending
+        @response.call_on_close
+        def cleanup():
+            _discard_dir(temp_download_dir)
+        
+        return response
+    
+    except Exception as e:
+        # Clean up on error
+        shutil.rmtree(temp_download_dir, ignore_errors=True)
+        raise e
+
+
+def _error_response(e, endpoint):
+    """Log an unexpected error and return it as JSON."""
+    error_msg = str(e)
+    print(f"[ERROR] Error in {endpoint}: {error_msg}")
+    import traceback
+    print("[ERROR] Full traceback:")
+    traceback.print_exc()
+    
+    # Return detailed error for debugging
+    return jsonify({
+        'error': error_msg,
+        'type': type(e).__name__,
+        'details': 'Check server logs for full traceback'
+    }), 500
+
 
-@app.route('/download-audio-batch', methods=['POST', 'OPTIONS'])
+@app.route('/download-audio-batch', methods=['POST'])
 def download_audio_batch():
     """
     Extract audio from video URLs.
@@ -328,9 +739,6 @@ def download_audio_batch():
     - Single audio file for single URL (format: m4a, opus, webm, etc.)
     - ZIP file containing multiple audio files for file upload
     """
-    if request.method == 'OPTIONS':
-        return '', 200
-    
     try:
         print("=" * 60)
         print("[DEBUG] Received request to /download-audio-batch")
@@ -367,149 +775,84 @@ def download_audio_batch():
             print(f"[DEBUG] File extension: {file_ext}")
             print(f"[DEBUG] Temp file path: {temp_file.name}")
             
-            # Check if it's a video file
-            video_extensions = ['.mp4', '.mov', '.avi', '.mkv', '.webm', '.flv', '.wmv', '.m4v']
-            
-            if file_ext in video_extensions:
-                # It's a video file - add to video_files list
-                print(f"[DEBUG] Detected as video file, adding to processing queue")
-                video_files.append(temp_file.name)
-
-            
-            elif file_ext == '.txt':
-                with open(temp_file.name, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                    urls = extract_urls_from_text(content)
-                # Clean up temp file
-                os.unlink(temp_file.name)
-            
-            elif file_ext == '.docx':
-                urls = extract_urls_from_docx(temp_file.name)
-                # Clean up temp file
-                os.unlink(temp_file.name)
-            
-            elif file_ext == '.pdf':
-                urls = extract_urls_from_pdf(temp_file.name)
-                # Clean up temp file
-                os.unlink(temp_file.name)
-            
-            else:
-                os.unlink(temp_file.name)
-                return jsonify({'error': f'Unsupported file type: {file_ext}'}), 400
+            try:
+                urls, video_files = _sources_from_file(temp_file.name, file_ext)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
         
         else:
             return jsonify({'error': 'No URL or file provided'}), 400
         
-        if not urls and not video_files:
-            return jsonify({'error': 'No valid URLs or video files found'}), 400
+        return _process_sources(urls, video_files)
+    
+    except Exception as e:
+        return _error_response(e, 'download_audio_batch')
+
+
+@app.route('/download-audio-batch-stream', methods=['POST'])
+def download_audio_batch_stream():
+    """
+    Same as /download-audio-batch, but the file is sent as the raw request body
+    (Content-Type: application/octet-stream) instead of multipart form-data.
+    
+    Headers:
+    - X-Filename: original file name (its extension selects the handling)
+    - X-Is-Video: "1"/"true" to treat the body as a video regardless of extension
+    
+    The body is copied straight to disk in large chunks, skipping Werkzeug's
+    multipart parser, which is slow and memory hungry for big video uploads.
+    """
+    try:
+        filename = request.headers.get('X-Filename', '').strip()
+        if not filename:
+            return jsonify({'error': 'Missing X-Filename header'}), 400
+        
+        file_ext = Path(filename).suffix.lower()
+        is_video = request.headers.get('X-Is-Video', '').strip().lower() in ('1', 'true', 'yes')
+        if is_video and file_ext not in VIDEO_EXTENSIONS:
+            file_ext = '.mp4'
         
-        # Remove duplicates while preserving order
-        urls = list(dict.fromkeys(urls))
+        # Stream the request body to a temp file
+        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=file_ext)
+        try:
+            with temp_file:
+                shutil.copyfileobj(request.stream, temp_file, length=STREAM_CHUNK_SIZE)
+        except BaseException:
+            # Client disconnect, disk full, ...: don't leave the partial file
+            os.unlink(temp_file.name)
+            raise
         
-        print(f"Found {len(urls)} URL(s) and {len(video_files)} video file(s) to process")
+        if os.path.getsize(temp_file.name) == 0:
+            os.unlink(temp_file.name)
+            return jsonify({'error': 'Empty request body'}), 400
         
-        # Create temporary directory for downloads
-        temp_download_dir = tempfile.mkdtemp(prefix='audio_download_')
+        print(f"[DEBUG] Streamed upload: {filename} -> {temp_file.name}")
         
         try:
-            # Download audio files (with parallel processing for multiple URLs)
-            audio_files = []
-            
-            # Process video files first
-            for video_file in video_files:
-                audio_path = extract_audio_from_video(video_file, temp_download_dir)
-                if audio_path:
-                    audio_files.append(audio_path)
-                # Clean up the temporary video file
-                try:
-                    os.unlink(video_file)
-                except:
-                    pass
-            
-            # Process URLs
-            if len(urls) == 1 and not video_files:
-                # Single URL - direct download
-                audio_path = download_audio(urls[0], temp_download_dir)
-                if audio_path:
-                    audio_files.append(audio_path)
-            elif urls:
-                # Multiple URLs - parallel download
-                with concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor:
-                    future_to_url = {executor.submit(download_audio, url, temp_download_dir): url for url in urls}
-                    
-                    for future in concurrent.futures.as_completed(future_to_url):
-                        url = future_to_url[future]
-                        try:
-                            audio_path = future.result()
-                            if audio_path:
-                                audio_files.append(audio_path)
-                        except Exception as e:
-                            print(f"Error processing {url}: {e}")
-            
-            if not audio_files:
-                shutil.rmtree(temp_download_dir, ignore_errors=True)
-                return jsonify({'error': 'Failed to extract audio from any of the provided sources'}), 500
-            
-            # If single audio file, return it directly
-            if len(audio_files) == 1:
-                audio_file = audio_files[0]
-                filename = os.path.basename(audio_file)
-                mimetype = get_audio_mimetype(filename)
-                
-                response = send_file(
-                    audio_file,
-                    as_attachment=True,
-                    download_name=filename,
-                    mimetype=mimetype
-                )
-                
-                # Schedule cleanup after sending
-                @response.call_on_close
-                def cleanup():
-                    shutil.rmtree(temp_download_dir, ignore_errors=True)
-                
-                return response
-            
-            # Multiple audio files - create ZIP
-            zip_filename = f'audio_files_{len(audio_files)}_files.zip'
-            zip_path = os.path.join(temp_download_dir, zip_filename)
-            
-            with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                for audio_file in audio_files:
-                    zipf.write(audio_file, os.path.basename(audio_file))
-            
-            response = send_file(
-                zip_path,
-                as_attachment=True,
-                download_name=zip_filename,
-                mimetype='application/zip'
-            )
-            
-            # Schedule cleanup after sending
-            @response.call_on_close
-            def cleanup():
-                shutil.rmtree(temp_download_dir, ignore_errors=True)
-            
-            return response
+            urls, video_files = _sources_from_file(temp_file.name, file_ext)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        except Exception as e:
-            # Clean up on error
-            shutil.rmtree(temp_download_dir, ignore_errors=True)
-            raise e
+        return _process_sources(urls, video_files)
     
     except Exception as e:
-        error_msg = str(e)
-        print(f"[ERROR] Error in download_audio_batch: {error_msg}")
-        import traceback
-        print("[ERROR] Full traceback:")
-        traceback.print_exc()
-        
-        # Return detailed error for debugging
-        return jsonify({
-            'error': error_msg,
-            'type': type(e).__name__,
-            'details': 'Check server logs for full traceback'
-        }), 500
+        return _error_response(e, 'download_audio_batch_stream')
+
+def warmup():
+    """
+    Pay first-request costs up front: ffmpeg probe and one pre-built
+    YoutubeDL (extractor registration) parked in the pool. Under
+    `gunicorn --preload` this runs once in the master and is shared by
+    the forked workers.
+    """
+    global _FFMPEG_PATH
+    if _FFMPEG_PATH is None:
+        _FFMPEG_PATH = _find_ffmpeg_impl()
+    _release_ydl(_acquire_ydl())
+
+# Opt-in, as in app.py: set WARMUP=1 to warm up at import time
+if os.environ.get('WARMUP') == '1':
+    warmup()
 
 @app.route('/health', methods=['GET'])
 def health():
@@ -524,5 +867,7 @@ if __name__ == '__main__':
     print("Audio formats: M4A, OPUS, WEBM (native, with FFmpeg conversion)")
     print("Supported platforms: YouTube, Instagram, Twitter, TikTok, Facebook, and 1000+ more sites")
     print("Endpoint: POST /download-audio-batch")
+    print("For production use gunicorn, e.g.:")
+    print("  gunicorn -k gevent -w 4 --worker-connections 200 audioextractor:app")
     print("=" * 60)
-    app.run(debug=True, host='127.0.0.1', port=5000)
\ No newline at end of file
+    app.run(host='127.0.0.1', port=5000, threaded=True)
\ No newline at end of file
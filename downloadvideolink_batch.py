@@ -1,17 +1,27 @@
 # downloadvideolink_batch.py - ULTRA-FAST VERSION
-from flask import request, send_file, jsonify
+from flask import Response, request, send_file, jsonify
 import yt_dlp
 import os
 import tempfile
 import shutil
+import subprocess
 import zipfile
+import html
+import json
+import secrets
 from pathlib import Path
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 import re
+import fitz  # PyMuPDF
+from lxml import etree
 import PyPDF2
-from docx import Document
 import logging
 from functools import wraps
 import time
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from utils.helpers import save_upload, stream_zip
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -22,6 +32,42 @@ MAX_URLS = 50
 MAX_FILE_SIZE_MB = 100
 DOWNLOAD_TIMEOUT = 300
 ALLOWED_EXTENSIONS = {'.txt', '.pdf', '.docx'}
+DEFAULT_PARALLEL_DOWNLOADS = 5
+MAX_PARALLEL_DOWNLOADS = 8
+INFO_WORKERS = 8  # parallel info probes feeding the download pool
+_NAMES_LOCK = threading.Lock()
+
+# Finished /download-video-batch/stream results, fetched via /downloads/<token>
+BATCH_RESULTS_DIR = os.path.join(tempfile.gettempdir(), 'video_batch_results')
+BATCH_RESULT_TTL = 3600
+_TOKEN_RE = re.compile(r'^[A-Za-z0-9_-]{16,64}$')
+
+# Optional Netscape cookies file for yt-dlp (logged-in sessions). Platforms
+# listed in AUTH_REQUIRED_PLATFORMS (opt-in; public posts on most platforms
+# download without login) fail fast without it instead of tying up a
+# worker until yt-dlp's login/timeout retries give up.
+COOKIE_FILE = os.environ.get('YTDLP_COOKIE_FILE') or None
+_REQUIRES_AUTH = {
+    p.strip() for p in os.environ.get('AUTH_REQUIRED_PLATFORMS', '').split(',')
+    if p.strip()
+}
+
+# URL scanner, compiled once. Note `$-_` is a character *range* (0x24-0x5F)
+# and deliberately so: it covers / : ? = # & % digits and A-Z. Since % and
+# hex digits are in the class, %XX escapes need no separate alternative.
+_URL_PATTERN = r'http[s]?://[a-zA-Z0-9$-_@.&+!*(),]+'
+
+# google-re2 (optional) matches in linear time on any input; same API
+try:
+    import re2
+    _URL_RE = re2.compile(_URL_PATTERN)
+except ImportError:
+    _URL_RE = re.compile(_URL_PATTERN)
+
+_URL_VALIDATE_RE = re.compile(r'^https?://')
+
+# Anything but (unicode) letters/digits, space, '-', '_' and '.'
+_BAD_FN_RE = re.compile(r'[^\w .-]')
 
 def find_ffmpeg():
     """Find FFmpeg executable"""
@@ -38,23 +84,68 @@ def find_ffmpeg():
             return p
     return None
 
+# Probed once at import instead of on every download
+_FFMPEG_PATH = find_ffmpeg()
+
 def validate_url(url):
     """Validate URL format"""
     if not url or not isinstance(url, str):
         return False
-    url_pattern = r'^https?://'
-    return bool(re.match(url_pattern, url.strip()))
+    return bool(_URL_VALIDATE_RE.match(url.strip()))
+
+_CLOSING_BRACKETS = {')': '(', ']': '['}
+
+def _strip_trailing_punct(url):
+    """Drop trailing . , ; and any ) or ] without a matching opener, so
+    "(see https://x.y/a)." loses ")." but .../Foo_(bar) keeps its paren"""
+    while url and url[-1] in '.,;)]':
+        opener = _CLOSING_BRACKETS.get(url[-1])
+        if opener and url.count(opener) >= url.count(url[-1]):
+            break
+        url = url[:-1]
+    return url
+
+def _canonical_url(url):
+    """Normalize a URL for de-duplication: drop trailing punctuation picked up
+    from prose, the #fragment, and lowercase the scheme/host"""
+    url = _strip_trailing_punct(url.strip()).split('#', 1)[0]
+    scheme, sep, rest = url.partition('://')
+    host, slash, path = rest.partition('/')
+    return f"{scheme.lower()}{sep}{host.lower()}{slash}{path}"
+
+# Query params that don't change which video a URL points at
+_TRACKING_PARAMS = {'fbclid', 'gclid', 'igshid', 'si', 't', 'feature'}
+
+def _dedupe_key(url):
+    """Key under which variants of the same link collide: tracking params
+    (utm_*, fbclid, share ids, start time) and a trailing slash ignored"""
+    parts = urlsplit(url)
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+             if k not in _TRACKING_PARAMS and not k.startswith('utm_')]
+    return urlunsplit((parts.scheme, parts.netloc, parts.path.rstrip('/'), urlencode(query), ''))
+
+def dedupe_urls(urls):
+    """Canonicalize and de-duplicate URLs, keeping first-seen order"""
+    seen = set()
+    unique = []
+    for url in map(_canonical_url, urls):
+        try:
+            key = _dedupe_key(url)
+        except ValueError:  # malformed (e.g. bad IPv6 host); compare as-is
+            key = url
+        if key not in seen:
+            seen.add(key)
+            unique.append(url)
+    return unique
 
 def sanitize_filename(filename):
     """Sanitize filename to prevent directory traversal"""
-    safe_chars = "".join(c for c in filename if c.isalnum() or c in (' ', '-', '_', '.'))
-    return safe_chars[:255]
+    return _BAD_FN_RE.sub('', filename)[:255]
 
 def extract_urls_from_text(text):
     """Extract URLs from text"""
     try:
-        urls = re.findall(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', text)
-        return [u.strip() for u in urls if validate_url(u)]
+        return [u.strip() for u in _URL_RE.findall(text) if u.strip()]
     except Exception as e:
         logger.error(f"Error extracting URLs from text: {e}")
         return []
@@ -68,47 +159,138 @@ def extract_urls_from_txt(path):
         logger.error(f"Error reading txt file: {e}")
         return []
 
+# poppler's pdftotext is the fastest raw text dump when installed
+_PDFTOTEXT = shutil.which('pdftotext')
+
+def _pdf_text_pdftotext(path):
+    """PDF text via pdftotext, or None if unavailable/failed"""
+    if not _PDFTOTEXT:
+        return None
+    try:
+        proc = subprocess.run([_PDFTOTEXT, '-raw', '-nopgbrk', path, '-'],
+                              capture_output=True, timeout=30)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        logger.warning(f"pdftotext failed: {e}")
+        return None
+    if proc.returncode != 0:
+        logger.warning(f"pdftotext exited with {proc.returncode}")
+        return None
+    return proc.stdout.decode('utf-8', errors='ignore')
+
+def _pdf_text_pypdf2(path):
+    """PDF text via PyPDF2 (slowest, most lenient)"""
+    with open(path, 'rb') as f:
+        pdf = PyPDF2.PdfReader(f)
+        return '\n'.join(page.extract_text() or '' for page in pdf.pages)
+
+def _pdf_urls_fitz(path):
+    """URLs from a PDF via PyMuPDF.
+    
+    Link annotations (/Annot /Link /URI) are read straight off each page;
+    only pages without any are rendered to text and regex-scanned. When no
+    page has links the text comes from pdftotext if installed.
+    """
+    urls = []
+    with fitz.open(path) as doc:
+        text_pages = []
+        for page in doc:
+            links = [link['uri'] for link in page.get_links() if validate_url(link.get('uri'))]
+            if links:
+                urls.extend(links)
+            else:
+                text_pages.append(page.number)
+        
+        if text_pages:
+            text = None
+            if len(text_pages) == doc.page_count:
+                text = _pdf_text_pdftotext(path)
+            if text is None:
+                # "text" mode skips layout analysis; we only regex it
+                text = '\n'.join(doc[n].get_text("text") for n in text_pages)
+            # One regex sweep over all remaining pages instead of one per page
+            urls.extend(extract_urls_from_text(text))
+    return urls
+
 def extract_urls_from_pdf(path):
     """Extract URLs from .pdf file"""
-    urls = []
     try:
-        with open(path, 'rb') as f:
-            pdf = PyPDF2.PdfReader(f)
-            for page in pdf.pages:
-                try:
-                    text = page.extract_text()
-                    urls.extend(extract_urls_from_text(text))
-                except Exception as e:
-                    logger.warning(f"Error extracting from PDF page: {e}")
-                    continue
+        urls = _pdf_urls_fitz(path)
+    except fitz.FileDataError as e:
+        # MuPDF couldn't parse it; PyPDF2 is slower but more forgiving
+        logger.warning(f"PyMuPDF could not open PDF ({e}), retrying with PyPDF2")
+        try:
+            urls = extract_urls_from_text(_pdf_text_pypdf2(path))
+        except Exception as e:
+            logger.error(f"Error reading PDF file: {e}")
+            return []
     except Exception as e:
         logger.error(f"Error reading PDF file: {e}")
-    return urls
+        return []
+    return list(dict.fromkeys(urls))
+
+# WordprocessingML tags and the hyperlink targets in document.xml.rels
+_W_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+_W_T = _W_NS + 't'
+_W_P = _W_NS + 'p'
+_W_R = _W_NS + 'r'
+# Run-level breaks, as python-docx renders them in run text
+_W_BREAKS = {_W_NS + 'tab': '\t', _W_NS + 'br': '\n', _W_NS + 'cr': '\n'}
+_DOCX_REL_TARGET_RE = re.compile(r'Target="(https?://[^"]+)"')
 
 def extract_urls_from_docx(path):
-    """Extract URLs from .docx file"""
-    urls = []
+    """Extract URLs from .docx file
+    
+    Streams word/document.xml with lxml iterparse instead of building
+    python-docx objects. Text of each paragraph's runs is joined (a URL can
+    be split across runs) and paragraphs become lines; elements are cleared
+    as we go so memory stays flat. Hyperlink targets come from the
+    relationships part.
+    """
     try:
-        doc = Document(path)
-        for para in doc.paragraphs:
+        lines = []
+        with zipfile.ZipFile(path) as z:
+            with z.open('word/document.xml') as f:
+                parts = []
+                for _, el in etree.iterparse(f, events=('end',), tag=(_W_T, _W_P, *_W_BREAKS)):
+                    if el.tag == _W_T:
+                        if el.text:
+                            parts.append(el.text)
+                    elif el.tag in _W_BREAKS:
+                        # w:tab also defines tab stops in w:pPr; only runs count
+                        parent = el.getparent()
+                        if parent is not None and parent.tag == _W_R:
+                            parts.append(_W_BREAKS[el.tag])
+                    else:
+                        if parts:
+                            lines.append(''.join(parts))
+                            parts = []
+                        el.clear()
+                        # Drop finished siblings too, or the tree keeps growing
+                        parent = el.getparent()
+                        while parent is not None and el.getprevious() is not None:
+                            del parent[0]
             try:
-                urls.extend(extract_urls_from_text(para.text))
-            except Exception as e:
-                logger.warning(f"Error extracting from DOCX paragraph: {e}")
-                continue
+                rels = z.read('word/_rels/document.xml.rels').decode('utf-8', 'ignore')
+            except KeyError:
+                rels = ''
+        
+        urls = extract_urls_from_text('\n'.join(lines))
+        urls.extend(html.unescape(u) for u in _DOCX_REL_TARGET_RE.findall(rels))
+        return urls
     except Exception as e:
         logger.error(f"Error reading DOCX file: {e}")
-    return urls
+        return []
+
+# Max video height per quality option (also the list of valid options)
+_QUALITY_HEIGHTS = {
+    '2160p': 2160, '1440p': 1440, '1080p': 1080, '720p': 720,
+    '480p': 480, '360p': 360, '240p': 240, '144p': 144, 'best': 9999
+}
 
 def select_format_by_quality(formats, target_quality):
     """Select best format ID based on target quality"""
     try:
-        quality_heights = {
-            '2160p': 2160, '1440p': 1440, '1080p': 1080, '720p': 720,
-            '480p': 480, '360p': 360, '240p': 240, '144p': 144, 'best': 9999
-        }
-        
-        target_height = quality_heights.get(target_quality, 9999)
+        target_height = _QUALITY_HEIGHTS.get(target_quality, 9999)
         
         # Filter video formats
         video_formats = [f for f in formats if f.get('vcodec') != 'none' and f.get('height')]
@@ -130,36 +312,51 @@ def select_format_by_quality(formats, target_quality):
         logger.error(f"Error selecting format: {e}")
         return None
 
+# Known platforms and their domains
+_PLATFORM_DOMAINS = {
+    'youtube': ['youtube.com', 'youtu.be'],
+    'twitter': ['twitter.com', 'x.com', 't.co'],
+    'instagram': ['instagram.com', 'instagr.am'],
+    'facebook': ['facebook.com', 'fb.watch', 'fb.com'],
+    'tiktok': ['tiktok.com', 'vm.tiktok.com'],
+    'reddit': ['reddit.com', 'redd.it', 'v.redd.it'],
+    'vimeo': ['vimeo.com'],
+    'dailymotion': ['dailymotion.com', 'dai.ly'],
+    'twitch': ['twitch.tv', 'clips.twitch.tv'],
+    'linkedin': ['linkedin.com'],
+    'snapchat': ['snapchat.com'],
+    'pinterest': ['pinterest.com', 'pin.it'],
+    'tumblr': ['tumblr.com'],
+    'streamable': ['streamable.com'],
+    'imgur': ['imgur.com'],
+    'soundcloud': ['soundcloud.com'],
+    'spotify': ['spotify.com'],
+    'bandcamp': ['bandcamp.com'],
+}
+
+# One alternation with a named group per platform, matched against the
+# URL's host only: a domain counts when it is the whole host or a suffix
+# after a dot, so x.com doesn't match netflix.com nor t.co a path segment
+_PLATFORM_RE = re.compile(
+    r'(?:^|\.)(?:' + '|'.join(
+        f"(?P<{platform}>{'|'.join(re.escape(d) for d in domains)})"
+        for platform, domains in _PLATFORM_DOMAINS.items()
+    ) + r')$',
+    re.IGNORECASE,
+)
+_HOST_END_RE = re.compile(r'[/?#]')
+
 def detect_platform(url):
     """Detect video platform from URL"""
-    url_lower = url.lower()
-    
-    platforms = {
-        'youtube': ['youtube.com', 'youtu.be'],
-        'twitter': ['twitter.com', 'x.com', 't.co'],
-        'instagram': ['instagram.com', 'instagr.am'],
-        'facebook': ['facebook.com', 'fb.watch', 'fb.com'],
-        'tiktok': ['tiktok.com', 'vm.tiktok.com'],
-        'reddit': ['reddit.com', 'redd.it', 'v.redd.it'],
-        'vimeo': ['vimeo.com'],
-        'dailymotion': ['dailymotion.com', 'dai.ly'],
-        'twitch': ['twitch.tv', 'clips.twitch.tv'],
-        'linkedin': ['linkedin.com'],
-        'snapchat': ['snapchat.com'],
-        'pinterest': ['pinterest.com', 'pin.it'],
-        'tumblr': ['tumblr.com'],
-        'streamable': ['streamable.com'],
-        'imgur': ['imgur.com'],
-        'soundcloud': ['soundcloud.com'],
-        'spotify': ['spotify.com'],
-        'bandcamp': ['bandcamp.com'],
-    }
-    
-    for platform, domains in platforms.items():
-        if any(domain in url_lower for domain in domains):
-            return platform
-    
-    return 'generic'
+    # host[:port] between '://' and the next '/', '?' or '#'
+    host = url.partition('://')[2]
+    host = _HOST_END_RE.split(host, 1)[0].rpartition('@')[2].split(':', 1)[0]
+    m = _PLATFORM_RE.search(host)
+    return m.lastgroup if m else 'generic'
+
+# aria2c (if installed) for platforms serving long HLS streams
+_ARIA2C = shutil.which('aria2c')
+_ARIA2C_PLATFORMS = {'twitch', 'vimeo'}
 
 def get_platform_optimized_options(platform, quality='best'):
     """Get platform-specific optimized download options"""
@@ -173,7 +370,6 @@ def get_platform_optimized_options(platform, quality='best'):
         'retries': 2,
         'fragment_retries': 2,
         'extractor_retries': 1,
-        'concurrent_fragment_downloads': 16,
         'http_chunk_size': 20971520,
         'buffersize': 65536,
         'throttledratelimit': None,
@@ -198,6 +394,7 @@ def get_platform_optimized_options(platform, quality='best'):
         'youtube': {
             'format': 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best',
             'merge_output_format': 'mp4',
+            'concurrent_fragment_downloads': 16,
         },
         'twitter': {
             'format': 'best',
@@ -229,15 +426,18 @@ def get_platform_optimized_options(platform, quality='best'):
         'reddit': {
             'format': 'best',
             'merge_output_format': 'mp4',
+            'concurrent_fragment_downloads': 4,
         },
         'vimeo': {
             'format': 'best[ext=mp4]/best',
+            'concurrent_fragment_downloads': 4,
             'http_headers': {
                 'Referer': 'https://vimeo.com/',
             },
         },
         'twitch': {
             'format': 'best',
+            'concurrent_fragment_downloads': 8,
             'http_headers': {
                 'Client-ID': 'kimne78kx3ncx6brgo4mv6wki5h1ko',
             },
@@ -254,17 +454,91 @@ def get_platform_optimized_options(platform, quality='best'):
     opts = base_opts.copy()
     if platform in platform_opts:
         opts.update(platform_opts[platform])
-        logger.info(f"Using {platform} optimized settings")
+        logger.debug("Using %s optimized settings", platform)
     else:
         opts['format'] = 'best'
-        logger.info(f"Using generic settings for {platform}")
+        logger.debug("Using generic settings for %s", platform)
+    
+    # HLS-heavy sites: let aria2c fetch with multiple connections per file
+    if platform in _ARIA2C_PLATFORMS and _ARIA2C:
+        opts['external_downloader'] = {'default': _ARIA2C}
+        opts['external_downloader_args'] = {'aria2c': ['-x', '16', '-s', '16', '-k', '1M']}
     
     return opts
 
-def download_single_video(url, output_dir, index=0, quality='best'):
-    """Download video with MAXIMUM SPEED optimization - UNIVERSAL PLATFORM SUPPORT"""
-    temp_files = []
+def _claim_name(used_names, output_dir, base, ext):
+    """Pick a unique file name for this batch: `base.ext`, `base_1.ext`, ...
+    Collisions are resolved against the batch's in-memory set rather than by
+    stat-ing the directory once per candidate."""
+    with _NAMES_LOCK:
+        if used_names is None:
+            used_names = set()
+        candidate = f"{base}{ext}"
+        # One stat for a pre-existing file, then only set lookups
+        if os.path.exists(os.path.join(output_dir, candidate)):
+            used_names.add(candidate)
+        counter = 1
+        while candidate in used_names:
+            candidate = f"{base}_{counter}{ext}"
+            counter += 1
+        used_names.add(candidate)
+        return candidate
+
+# Info-probe options (no download)
+_INFO_OPTS = {
+    'quiet': True,
+    'no_warnings': True,
+    'skip_download': True,
+    'socket_timeout': 15,
+    'extractor_retries': 1,
+    'geo_bypass': True,
+    'cookiefile': COOKIE_FILE,
+}
+
+def _download_opts(platform):
+    """Full download options for a platform (format/outtmpl set per URL)"""
+    download_opts = get_platform_optimized_options(platform)
+    download_opts['outtmpl'] = {'default': '%(title)s.%(ext)s'}
+    download_opts['merge_output_format'] = 'mp4'
+    
+    # FFMPEG SPEED OPTIMIZATION
+    # Merges are pure stream copies (no encoder runs, so -preset is moot);
+    # the args target only the merger's output file
+    download_opts['postprocessor_args'] = {
+        'merger+ffmpeg_o': [
+            '-c', 'copy',  # Remux only, never re-encode
+            '-movflags', '+faststart',  # Web optimization
+        ]
+    }
+    
+    # Add cookies support for platforms that need it
+    download_opts['cookiefile'] = COOKIE_FILE
+    
+    if _FFMPEG_PATH:
+        download_opts['ffmpeg_location'] = _FFMPEG_PATH
     
+    return download_opts
+
+# YoutubeDL instances are expensive to build (extractor registry, handler
+# chain, cookie jar) and not thread-safe, so each worker thread keeps its
+# own, reused for every URL it processes in the batch
+_THREAD_YDL = threading.local()
+
+def _thread_ydl(key, make_opts):
+    """This thread's YoutubeDL for key, built from make_opts() on first use"""
+    instances = getattr(_THREAD_YDL, 'instances', None)
+    if instances is None:
+        instances = _THREAD_YDL.instances = {}
+    ydl = instances.get(key)
+    if ydl is None:
+        ydl = instances[key] = yt_dlp.YoutubeDL(make_opts())
+    return ydl
+
+def probe_video(url, quality='best'):
+    """Extract a video's info and choose its format (no download).
+    Returns {'success': True, 'platform', 'info', 'format', 'start_time'} or
+    {'success': False, 'error'}. 'info' is None for non-YouTube platforms,
+    which are extracted during the download itself."""
     try:
         if not validate_url(url):
             logger.warning(f"Invalid URL: {url}")
@@ -272,132 +546,124 @@ def download_single_video(url, output_dir, index=0, quality='best'):
         
         # Detect platform
         platform = detect_platform(url)
-        logger.info(f"Platform detected: {platform}")
+        logger.debug("Platform detected: %s", platform)
         
-        output_template = os.path.join(output_dir, f'video_{index}.%(ext)s')
-        ffmpeg = find_ffmpeg()
+        if platform in _REQUIRES_AUTH and not COOKIE_FILE:
+            logger.warning(f"Skipping {platform} URL (login required, no cookies configured): {url}")
+            return {'success': False, 'error': f'{platform} requires login (no cookies configured)'}
         
-        logger.info(f"Downloading {quality}: {url[:60]}...")
+        logger.debug("Probing %s: %.60s...", quality, url)
         start_time = time.time()
         
-        # Extract info (FAST)
-        info_opts = {
-            'quiet': True,
-            'no_warnings': True,
-            'skip_download': True,
-            'socket_timeout': 15,
-            'extractor_retries': 1,
-            'geo_bypass': True,
-        }
-        
-        with yt_dlp.YoutubeDL(info_opts) as ydl:
-            info = ydl.extract_info(url, download=False)
-            
-            if not info:
-                return {'success': False, 'error': 'Cannot extract video info'}
-            
-            formats = info.get('formats', [])
-            
-            # For platforms with quality selection (mainly YouTube)
-            format_string = None
-            if platform == 'youtube' and formats:
-                # Select format
-                video_format_id = select_format_by_quality(formats, quality)
-                
-                if video_format_id:
-                    # Get audio
-                    audio_formats = [f for f in formats if f.get('acodec') != 'none' and f.get('vcodec') == 'none']
-                    audio_format_id = None
-                    if audio_formats:
-                        best_audio = max(audio_formats, key=lambda x: x.get('abr', 0))
-                        audio_format_id = best_audio['format_id']
-                    
-                    # Construct format string
-                    format_string = f"{video_format_id}+{audio_format_id}" if audio_format_id else video_format_id
-                    logger.info(f"Format: {format_string}")
-            
-            # For other platforms, use best available
-            if not format_string:
-                format_string = 'best'
-                logger.info(f"Using best available format for {platform}")
-            
-            # Get platform-optimized options
-            download_opts = get_platform_optimized_options(platform, quality)
-            download_opts['format'] = format_string
-            download_opts['outtmpl'] = output_template
-            download_opts['merge_output_format'] = 'mp4'
-            
-            # FFMPEG SPEED OPTIMIZATION
-            download_opts['postprocessor_args'] = {
-                'ffmpeg': [
-                    '-preset', 'ultrafast',  # Fastest encoding
-                    '-threads', '0',  # Use all CPU cores
-                    '-movflags', '+faststart',  # Web optimization
-                ]
-            }
-            
-            # Add cookies support for platforms that need it
-            download_opts['cookiefile'] = None  # Can be set if needed
-            
-            if ffmpeg:
-                download_opts['ffmpeg_location'] = ffmpeg
-            
-            with yt_dlp.YoutubeDL(download_opts) as ydl_download:
-                ydl_download.download([url])
-            
-            # Find file (check multiple extensions)
-            filename = output_template.replace('%(ext)s', 'mp4')
-            
-            if not os.path.exists(filename):
-                possible_exts = ['.webm', '.mkv', '.mp4', '.mov', '.avi', '.flv', '.m4v', '.ts']
-                for ext in possible_exts:
-                    test_file = output_template.replace('%(ext)s', ext[1:])
-                    if os.path.exists(test_file):
-                        filename = test_file
-                        break
-            
-            if not os.path.exists(filename):
-                return {'success': False, 'error': 'Downloaded file not found'}
-            
-            temp_files.append(filename)
-            
-            # Validate file
-            size_mb = os.path.getsize(filename) / (1024 * 1024)
-            if size_mb == 0:
-                return {'success': False, 'error': 'Downloaded file is empty'}
-            
-            # Sanitize title
-            title = info.get('title', f'video_{index}')
-            safe_title = sanitize_filename(title)[:50]
-            
-            # Rename
-            ext = os.path.splitext(filename)[1]
-            new_name = os.path.join(output_dir, f'{safe_title}{ext}')
-            
-            counter = 1
-            base_name = new_name
-            while os.path.exists(new_name):
-                new_name = f"{os.path.splitext(base_name)[0]}_{counter}{ext}"
-                counter += 1
-            
-            if filename != new_name:
-                shutil.move(filename, new_name)
-                filename = new_name
-            
-            elapsed = time.time() - start_time
-            speed_mbps = (size_mb * 8) / elapsed if elapsed > 0 else 0
-            
-            logger.info(f"Success [{platform}]: {size_mb:.1f}MB in {elapsed:.1f}s ({speed_mbps:.1f} Mbps) - {os.path.basename(filename)}")
-            
+        # Only YouTube needs the info up front (quality selection); other
+        # platforms download with 'best' in a single pass in fetch_video
+        if platform != 'youtube':
             return {
                 'success': True,
-                'filename': filename,
-                'title': safe_title,
-                'filesize_mb': size_mb,
-                'download_time': elapsed,
-                'platform': platform
+                'platform': platform,
+                'info': None,
+                'format': 'best',
+                'start_time': start_time,
             }
+        
+        info = _thread_ydl('info', lambda: dict(_INFO_OPTS)).extract_info(url, download=False)
+        
+        if not info:
+            return {'success': False, 'error': 'Cannot extract video info'}
+        
+        formats = info.get('formats', [])
+        
+        # For platforms with quality selection (mainly YouTube)
+        format_string = None
+        if platform == 'youtube' and formats:
+            # Select format
+            video_format_id = select_format_by_quality(formats, quality)
             
+            if video_format_id:
+                # Get audio
+                audio_formats = [f for f in formats if f.get('acodec') != 'none' and f.get('vcodec') == 'none']
+                audio_format_id = None
+                if audio_formats:
+                    best_audio = max(audio_formats, key=lambda x: x.get('abr', 0))
+                    audio_format_id = best_audio['format_id']
+                
+                # Construct format string
+                format_string = f"{video_format_id}+{audio_format_id}" if audio_format_id else video_format_id
+                logger.debug("Format: %s", format_string)
+        
+        # For other platforms, use best available
+        if not format_string:
+            format_string = 'best'
+            logger.debug("Using best available format for %s", platform)
+        
+        return {
+            'success': True,
+            'platform': platform,
+            'info': info,
+            'format': format_string,
+            'start_time': start_time,
+        }
+    
+    except Exception as e:
+        logger.error(f"Info extraction error: {str(e)}")
+        return {'success': False, 'error': str(e)}
+
+def fetch_video(url, probe, output_dir, index=0, used_names=None):
+    """Download a probed video (see probe_video) into output_dir"""
+    temp_files = []
+    
+    try:
+        platform = probe['platform']
+        info = probe['info']
+        format_string = probe['format']
+        start_time = probe['start_time']
+        
+        # Per-thread downloader for this platform; only the output template
+        # and format selection change between URLs
+        ydl_download = _thread_ydl(('download', platform), lambda: _download_opts(platform))
+        ydl_download.format_selector = ydl_download.build_format_selector(format_string)
+        if info is None:
+            # Extraction only; the download below reuses this info
+            info = ydl_download.extract_info(url, download=False)
+            if not info:
+                return {'success': False, 'error': 'Cannot extract video info'}
+        
+        # Sanitize title
+        title = info.get('title', f'video_{index}')
+        safe_title = sanitize_filename(title)[:50] or f'video_{index}'
+        
+        # Download straight to the final name; the extension is only known
+        # after format selection/merging, so names are claimed per stem
+        stem = _claim_name(used_names, output_dir, safe_title, '')
+        ydl_download.params['outtmpl']['default'] = os.path.join(output_dir, f'{stem}.%(ext)s')
+        result = ydl_download.process_ie_result(info, download=True) or info
+        
+        downloads = result.get('requested_downloads') or []
+        filename = downloads[-1].get('filepath') if downloads else None
+        if not filename or not os.path.exists(filename):
+            return {'success': False, 'error': 'Downloaded file not found'}
+        
+        temp_files.append(filename)
+        
+        # Validate file
+        size_mb = os.path.getsize(filename) / (1024 * 1024)
+        if size_mb == 0:
+            return {'success': False, 'error': 'Downloaded file is empty'}
+        
+        elapsed = time.time() - start_time
+        speed_mbps = (size_mb * 8) / elapsed if elapsed > 0 else 0
+        
+        logger.info(f"Success [{platform}]: {size_mb:.1f}MB in {elapsed:.1f}s ({speed_mbps:.1f} Mbps) - {os.path.basename(filename)}")
+        
+        return {
+            'success': True,
+            'filename': filename,
+            'title': safe_title,
+            'filesize_mb': size_mb,
+            'download_time': elapsed,
+            'platform': platform
+        }
+        
     except Exception as e:
         logger.error(f"Download error: {str(e)}")
         for f in temp_files:
@@ -408,95 +674,169 @@ def download_single_video(url, output_dir, index=0, quality='best'):
                 pass
         return {'success': False, 'error': str(e)}
 
-def download_video_batch():
-    """Main endpoint - ULTRA-FAST VERSION"""
+def download_single_video(url, output_dir, index=0, quality='best', used_names=None):
+    """Download video with MAXIMUM SPEED optimization - UNIVERSAL PLATFORM SUPPORT"""
+    probe = probe_video(url, quality)
+    if not probe.get('success'):
+        return probe
+    return fetch_video(url, probe, output_dir, index, used_names)
+
+def _read_batch_request():
+    """Parse quality/concurrency and collect URLs from the current request.
+    
+    Returns (batch, None) on success, where batch has urls, quality,
+    concurrency and temp_dir, or (None, error_response). On error any temp
+    dir created here has already been removed.
+    """
     temp_dir = None
+    urls = []
+    quality = request.form.get('quality', 'best').lower()
     
+    # Parallel downloads per request (client-tunable, clamped)
     try:
-        urls = []
-        quality = request.form.get('quality', 'best').lower()
-        
-        # Validate quality
-        valid_qualities = ['2160p', '1440p', '1080p', '720p', '480p', '360p', '240p', '144p', 'best']
-        if quality not in valid_qualities:
-            quality = 'best'
-        
-        logger.info(f"Request: quality={quality}")
-        
-        # Handle file upload
-        if 'file' in request.files:
-            uploaded_file = request.files['file']
-            
-            if not uploaded_file.filename:
-                return jsonify({'error': 'No file selected'}), 400
-            
-            file_ext = os.path.splitext(uploaded_file.filename.lower())[1]
-            if file_ext not in ALLOWED_EXTENSIONS:
-                return jsonify({'error': f'Invalid file type. Allowed: {", ".join(ALLOWED_EXTENSIONS)}'}), 400
-            
-            temp_dir = tempfile.mkdtemp()
-            file_path = os.path.join(temp_dir, sanitize_filename(uploaded_file.filename))
-            
-            try:
-                uploaded_file.save(file_path)
-            except Exception as e:
-                logger.error(f"File save error: {e}")
-                return jsonify({'error': 'Failed to save uploaded file'}), 500
-            
-            # Extract URLs
-            if file_ext == '.txt':
-                urls = extract_urls_from_txt(file_path)
-            elif file_ext == '.pdf':
-                urls = extract_urls_from_pdf(file_path)
-            elif file_ext == '.docx':
-                urls = extract_urls_from_docx(file_path)
+        concurrency = int(request.form.get('concurrency', DEFAULT_PARALLEL_DOWNLOADS))
+    except (TypeError, ValueError):
+        concurrency = DEFAULT_PARALLEL_DOWNLOADS
+    concurrency = max(1, min(concurrency, MAX_PARALLEL_DOWNLOADS))
+    
+    # Validate quality
+    if quality not in _QUALITY_HEIGHTS:
+        quality = 'best'
+    
+    logger.info(f"Request: quality={quality}, concurrency={concurrency}")
+    
+    def fail(message, status):
+        if temp_dir:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+        return None, (jsonify({'error': message}), status)
+    
+    # Handle file upload
+    if 'file' in request.files:
+        uploaded_file = request.files['file']
         
-        elif 'url' in request.form:
-            url = request.form.get('url', '').strip()
-            if validate_url(url):
-                urls = [url]
+        if not uploaded_file.filename:
+            return fail('No file selected', 400)
         
-        if not urls:
-            return jsonify({'error': 'No valid URLs found'}), 400
+        file_ext = os.path.splitext(uploaded_file.filename.lower())[1]
+        if file_ext not in ALLOWED_EXTENSIONS:
+            return fail(f'Invalid file type. Allowed: {", ".join(ALLOWED_EXTENSIONS)}', 400)
         
-        if len(urls) > MAX_URLS:
-            return jsonify({'error': f'Too many URLs. Maximum: {MAX_URLS}'}), 400
+        temp_dir = tempfile.mkdtemp()
+        file_path = os.path.join(temp_dir, sanitize_filename(uploaded_file.filename))
         
-        if not temp_dir:
-            temp_dir = tempfile.mkdtemp()
+        try:
+            save_upload(uploaded_file, file_path)
+        except Exception as e:
+            logger.error(f"File save error: {e}")
+            return fail('Failed to save uploaded file', 500)
         
-        # Remove duplicates
-        urls = list(dict.fromkeys(urls))
+        # Extract URLs
+        if file_ext == '.txt':
+            urls = extract_urls_from_txt(file_path)
+        elif file_ext == '.pdf':
+            urls = extract_urls_from_pdf(file_path)
+        elif file_ext == '.docx':
+            urls = extract_urls_from_docx(file_path)
+    
+    elif 'url' in request.form:
+        url = request.form.get('url', '').strip()
+        if validate_url(url):
+            urls = [url]
+    
+    # Remove duplicates (after normalizing) before enforcing the limit
+    urls = dedupe_urls(urls)
+    
+    if not urls:
+        return fail('No valid URLs found', 400)
+    
+    if len(urls) > MAX_URLS:
+        return fail(f'Too many URLs. Maximum: {MAX_URLS}', 400)
+    
+    if not temp_dir:
+        temp_dir = tempfile.mkdtemp()
+    
+    return {'urls': urls, 'quality': quality, 'concurrency': concurrency, 'temp_dir': temp_dir}, None
+
+def _run_downloads(urls, temp_dir, quality, concurrency):
+    """Download urls in parallel, yielding (idx, url, result) as each finishes.
+    
+    Info extraction and downloading are pipelined on separate pools: probes
+    run ahead (INFO_WORKERS wide) and each probed URL is handed to the
+    download pool (`concurrency` wide) as soon as its probe completes, so
+    probe latency hides under running downloads.
+    
+    If the consumer stops early (e.g. a streaming client disconnected),
+    queued work is cancelled and temp_dir is removed once the running
+    tasks have finished, so callers must not delete it themselves then.
+    """
+    used_names = set()  # file names handed out so far in this batch
+    
+    info_pool = ThreadPoolExecutor(max_workers=min(INFO_WORKERS, len(urls)))
+    dl_pool = ThreadPoolExecutor(max_workers=min(concurrency, len(urls)))
+    
+    # future -> (stage, idx, url)
+    stages = {info_pool.submit(probe_video, url, quality): ('info', idx, url)
+              for idx, url in enumerate(urls)}
+    pending = set(stages)
+    finished = False
+    try:
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage, idx, url = stages.pop(future)
+                try:
+                    result = future.result() or {'success': False, 'error': 'Unknown error'}
+                except Exception as e:
+                    result = {'success': False, 'error': str(e)}
+                
+                if stage == 'info' and result.get('success'):
+                    dl_future = dl_pool.submit(fetch_video, url, result, temp_dir, idx, used_names)
+                    stages[dl_future] = ('download', idx, url)
+                    pending.add(dl_future)
+                    continue
+                
+                if result.get('success'):
+                    dl_time = result.get('download_time', 0)
+                    logger.debug("[%d/%d] ✓ %.1fMB in %.1fs", idx + 1, len(urls), result.get('filesize_mb', 0), dl_time)
+                else:
+                    logger.warning(f"[{idx+1}/{len(urls)}] ✗ Failed: {result.get('error')}")
+                yield idx, url, result
+        finished = True
+    finally:
+        if finished:
+            info_pool.shutdown()
+            dl_pool.shutdown()
+        else:
+            info_pool.shutdown(wait=False, cancel_futures=True)
+            dl_pool.shutdown(wait=False, cancel_futures=True)
+            
+            def reap():
+                info_pool.shutdown(wait=True)
+                dl_pool.shutdown(wait=True)
+                shutil.rmtree(temp_dir, ignore_errors=True)
+            threading.Thread(target=reap, daemon=True).start()
+
+def download_video_batch():
+    """Main endpoint - ULTRA-FAST VERSION"""
+    temp_dir = None
+    
+    try:
+        batch, error = _read_batch_request()
+        if error:
+            return error
+        urls, temp_dir = batch['urls'], batch['temp_dir']
         
         logger.info(f"Processing {len(urls)} URL(s)")
         
-        # PARALLEL DOWNLOADS (Increased from 3 to 5)
+        # PARALLEL DOWNLOADS
         downloaded = []
         failed = 0
         
-        from concurrent.futures import ThreadPoolExecutor, as_completed
-        max_parallel = min(5, len(urls))  # Increased to 5 parallel downloads
-        
-        with ThreadPoolExecutor(max_workers=max_parallel) as executor:
-            future_to_url = {
-                executor.submit(download_single_video, url, temp_dir, idx, quality): (idx, url)
-                for idx, url in enumerate(urls)
-            }
-            
-            for future in as_completed(future_to_url):
-                idx, url = future_to_url[future]
-                try:
-                    result = future.result()
-                    if result and result.get('success'):
-                        downloaded.append(result['filename'])
-                        dl_time = result.get('download_time', 0)
-                        logger.info(f"[{idx+1}/{len(urls)}] ✓ {result.get('filesize_mb', 0):.1f}MB in {dl_time:.1f}s")
-                    else:
-                        failed += 1
-                        logger.warning(f"[{idx+1}/{len(urls)}] ✗ Failed")
-                except Exception as e:
-                    failed += 1
-                    logger.error(f"[{idx+1}/{len(urls)}] ✗ Error: {str(e)}")
+        for idx, url, result in _run_downloads(urls, temp_dir, batch['quality'], batch['concurrency']):
+            if result.get('success'):
+                downloaded.append(result['filename'])
+            else:
+                failed += 1
         
         if not downloaded:
             return jsonify({'error': 'All downloads failed'}), 500
@@ -512,24 +852,24 @@ def download_video_batch():
                     video_file,
                     as_attachment=True,
                     download_name=sanitize_filename(os.path.basename(video_file)),
-                    mimetype='video/mp4'
+                    mimetype='video/mp4',
+                    # Range requests / resume; body goes out via wsgi.file_wrapper
+                    conditional=True,
+                    etag=True,
+                    last_modified=os.path.getmtime(video_file)
                 )
                 resp.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
                 resp.headers['Pragma'] = 'no-cache'
                 resp.headers['Expires'] = '0'
                 
-                import threading
-                def delayed_cleanup():
-                    time.sleep(10)
-                    try:
-                        if temp_dir and os.path.exists(temp_dir):
-                            shutil.rmtree(temp_dir)
-                            logger.info(f"Cleaned up temp: {temp_dir}")
-                    except Exception as e:
-                        logger.error(f"Cleanup error: {e}")
+                # The response owns temp_dir from here and removes it once
+                # the body has been sent
+                owned_dir, temp_dir = temp_dir, None
                 
-                cleanup_thread = threading.Thread(target=delayed_cleanup, daemon=True)
-                cleanup_thread.start()
+                @resp.call_on_close
+                def cleanup():
+                    shutil.rmtree(owned_dir, ignore_errors=True)
+                    logger.info(f"Cleaned up temp: {owned_dir}")
                 
                 return resp
             except Exception as e:
@@ -541,45 +881,27 @@ def download_video_batch():
                         pass
                 return jsonify({'error': 'Failed to send file'}), 500
         
-        # Multiple videos - create ZIP
-        try:
-            zip_path = os.path.join(temp_dir, 'videos.zip')
-            with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zf:
-                for video_file in downloaded:
-                    zf.write(video_file, sanitize_filename(os.path.basename(video_file)))
-            
-            resp = send_file(
-                zip_path,
-                as_attachment=True,
-                download_name='videos.zip',
-                mimetype='application/zip'
-            )
-            resp.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
-            resp.headers['Pragma'] = 'no-cache'
-            resp.headers['Expires'] = '0'
-            
-            import threading
-            def delayed_cleanup():
-                time.sleep(10)
-                try:
-                    if temp_dir and os.path.exists(temp_dir):
-                        shutil.rmtree(temp_dir)
-                        logger.info(f"Cleaned up temp: {temp_dir}")
-                except Exception as e:
-                    logger.error(f"Cleanup error: {e}")
-            
-            cleanup_thread = threading.Thread(target=delayed_cleanup, daemon=True)
-            cleanup_thread.start()
-            
-            return resp
-        except Exception as e:
-            logger.error(f"ZIP creation error: {e}")
-            if temp_dir and os.path.exists(temp_dir):
-                try:
-                    shutil.rmtree(temp_dir)
-                except:
-                    pass
-            return jsonify({'error': 'Failed to create ZIP'}), 500
+        # Multiple videos - stream a ZIP (nothing extra written to disk)
+        entries = [(f, sanitize_filename(os.path.basename(f))) for f in downloaded]
+        resp = Response(
+            stream_zip(entries),
+            mimetype='application/zip',
+            headers={'Content-Disposition': 'attachment; filename=videos.zip'}
+        )
+        resp.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
+        resp.headers['Pragma'] = 'no-cache'
+        resp.headers['Expires'] = '0'
+        
+        # The generator reads the videos lazily, so the response now owns
+        # temp_dir and removes it once the body has been sent
+        owned_dir, temp_dir = temp_dir, None
+        
+        @resp.call_on_close
+        def cleanup():
+            shutil.rmtree(owned_dir, ignore_errors=True)
+            logger.info(f"Cleaned up temp: {owned_dir}")
+        
+        return resp
         
     except Exception as e:
         logger.error(f"Unexpected error: {str(e)}", exc_info=True)
@@ -591,4 +913,144 @@ def download_video_batch():
                 if os.path.exists(temp_dir):
                     shutil.rmtree(temp_dir)
             except Exception as e:
-                logger.error(f"Cleanup error: {e}")
\ No newline at end of file
+                logger.error(f"Cleanup error: {e}")
+
+
+def _purge_expired_results():
+    """Remove /downloads/<token> results older than BATCH_RESULT_TTL"""
+    cutoff = time.time() - BATCH_RESULT_TTL
+    try:
+        entries = list(os.scandir(BATCH_RESULTS_DIR))
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        try:
+            if entry.stat().st_mtime < cutoff:
+                shutil.rmtree(entry.path, ignore_errors=True)
+        except OSError:
+            pass
+
+def _sse(payload):
+    """Format one Server-Sent Events message"""
+    return f"data: {json.dumps(payload)}\n\n"
+
+def download_video_batch_stream():
+    """Same input as /download-video-batch, but reports progress as
+    Server-Sent Events (one per finished URL) instead of holding the
+    connection silent until everything is done. The last event carries a
+    /downloads/<token> URL to fetch the video or ZIP from."""
+    try:
+        batch, error = _read_batch_request()
+    except Exception as e:
+        logger.error(f"Unexpected error: {str(e)}", exc_info=True)
+        return jsonify({'error': 'Internal server error'}), 500
+    if error:
+        return error
+    
+    urls, temp_dir = batch['urls'], batch['temp_dir']
+    logger.info(f"Streaming progress for {len(urls)} URL(s)")
+    _purge_expired_results()
+    started = False
+    
+    def generate():
+        nonlocal started
+        started = True
+        downloaded = []
+        done = 0
+        completed = False
+        try:
+            yield _sse({'event': 'start', 'total': len(urls)})
+            
+            for idx, url, result in _run_downloads(urls, temp_dir, batch['quality'], batch['concurrency']):
+                done += 1
+                event = {
+                    'event': 'progress',
+                    'index': idx,
+                    'url': url,
+                    'success': bool(result.get('success')),
+                    'done': done,
+                    'total': len(urls),
+                }
+                if result.get('success'):
+                    downloaded.append(result['filename'])
+                    event['title'] = result.get('title')
+                    event['filesize_mb'] = round(result.get('filesize_mb', 0), 2)
+                else:
+                    event['error'] = result.get('error')
+                yield _sse(event)
+            completed = True
+            
+            if not downloaded:
+                yield _sse({'event': 'error', 'error': 'All downloads failed'})
+                return
+            
+            # Park the result under a random token for the follow-up GET
+            token = secrets.token_urlsafe(24)
+            result_dir = os.path.join(BATCH_RESULTS_DIR, token)
+            os.makedirs(result_dir)
+            
+            if len(downloaded) == 1:
+                name = sanitize_filename(os.path.basename(downloaded[0]))
+                os.replace(downloaded[0], os.path.join(result_dir, name))
+            else:
+                name = 'videos.zip'
+                with zipfile.ZipFile(os.path.join(result_dir, name), 'w', zipfile.ZIP_STORED,
+                                     allowZip64=True, strict_timestamps=False) as zf:
+                    for video_file in downloaded:
+                        zf.write(video_file, sanitize_filename(os.path.basename(video_file)))
+            
+            yield _sse({
+                'event': 'complete',
+                'downloaded': len(downloaded),
+                'failed': len(urls) - len(downloaded),
+                'filename': name,
+                'download_url': f'/downloads/{token}',
+            })
+        except Exception as e:
+            logger.error(f"Batch stream error: {e}", exc_info=True)
+            yield _sse({'event': 'error', 'error': 'Internal server error'})
+        finally:
+            # On an early disconnect _run_downloads removes temp_dir itself
+            if completed:
+                shutil.rmtree(temp_dir, ignore_errors=True)
+    
+    resp = Response(generate(), mimetype='text/event-stream')
+    resp.headers['Cache-Control'] = 'no-cache'
+    resp.headers['X-Accel-Buffering'] = 'no'  # don't let nginx buffer events
+    
+    @resp.call_on_close
+    def cleanup():
+        # Client gone before the first event: generate() never ran, so
+        # neither it nor _run_downloads will remove temp_dir
+        if not started:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+    
+    return resp
+
+def download_batch_result(token):
+    """Serve a finished streaming-batch result (see download_video_batch_stream).
+    The result is deleted once it has been sent."""
+    if not _TOKEN_RE.match(token):
+        return jsonify({'error': 'Invalid download token'}), 404
+    _purge_expired_results()
+    
+    result_dir = os.path.join(BATCH_RESULTS_DIR, token)
+    try:
+        names = os.listdir(result_dir)
+    except FileNotFoundError:
+        names = []
+    if not names:
+        return jsonify({'error': 'Download expired or not found'}), 404
+    
+    path = os.path.join(result_dir, names[0])
+    resp = send_file(
+        path,
+        as_attachment=True,
+        download_name=names[0],
+        mimetype='application/zip' if names[0].endswith('.zip') else 'video/mp4',
+        conditional=True,
+        etag=True,
+        last_modified=os.path.getmtime(path)
+    )
+    resp.call_on_close(lambda: shutil.rmtree(result_dir, ignore_errors=True))
+    return resp
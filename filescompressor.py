@@ -11,17 +11,25 @@ Flask file compressor that preserves original file types.
 - Headers returned:
     - X-Final-Size: bytes
     - X-Returned: original|compressed
-    - X-Method: gs|office|image|zip
+    - X-Method: qpdf|gs|office|image|zip
 - Requirements:
     - ghostscript (gs) for PDFs
     - Pillow (pip install pillow)
+    - optional: PyTurboJPEG + libturbojpeg for faster JPEG recompression
+    - optional: mozjpeg-lossless-optimization for smaller high/maximum JPEGs
+    - optional: pikepdf, tried before Ghostscript for low/medium PDFs
 """
+import functools
 import io
 import os
+import posixpath
 import zipfile
 import tempfile
 import shutil
 import subprocess
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import List, Tuple, Optional
 
@@ -29,11 +37,34 @@ from flask import Flask, request, send_file, render_template_string, abort, json
 from werkzeug.utils import secure_filename
 from shutil import which
 
+from utils.helpers import save_upload
+
 # Pillow
 try:
     from PIL import Image
 except Exception:
     Image = None
+_HAS_PIL = Image is not None
+
+# TurboJPEG (optional): JPEG -> JPEG without going through Pillow
+try:
+    from turbojpeg import TurboJPEG, TJSAMP_420, TJFLAG_FASTDCT, TJFLAG_PROGRESSIVE
+    _tj = TurboJPEG()
+except Exception:
+    _tj = None
+
+# mozjpeg lossless optimizer (optional): trellis/scan optimization of
+# finished JPEGs for the high/maximum presets
+try:
+    import mozjpeg_lossless_optimization
+except Exception:
+    mozjpeg_lossless_optimization = None
+
+# pikepdf (optional): lossless qpdf rewrite of PDFs, far cheaper than gs
+try:
+    import pikepdf
+except Exception:
+    pikepdf = None
 
 # CORS
 try:
@@ -46,7 +77,11 @@ ALLOWED_SINGLE_EXT = {
     "pdf", "docx", "pptx", "jpg", "jpeg", "png", "webp", "tif", "tiff", "bmp", "zip"
 }
 # Accept .doc and .ppt but we will not modify their internals (will return as-is).
-ALLOWED_EXTENSIONS = ALLOWED_SINGLE_EXT.union({"doc", "ppt"})
+PASSTHROUGH_EXT = {"doc", "ppt"}
+ALLOWED_EXTENSIONS = ALLOWED_SINGLE_EXT.union(PASSTHROUGH_EXT)
+IMAGE_EXT = {"jpg", "jpeg", "png", "webp", "tif", "tiff", "bmp"}
+# Image uploads below this (request size) are returned as-is
+SMALL_IMAGE_BYTES = 64 * 1024
 
 app = Flask(__name__)
 app.config["MAX_CONTENT_LENGTH"] = int(os.environ.get("MAX_CONTENT_LENGTH", 1200 * 1024 * 1024))  # 1.2 GB
@@ -77,20 +112,45 @@ HTML_FORM = """<!doctype html>
 <p>Supported single-file types: .pdf, .docx, .pptx, images (jpg/png/webp/tiff/bmp) and .zip containing these.</p>
 """
 
-# Map frontend option -> params: (jpeg_quality, scale, png_compress_level, gs_preset, gs_dpi)
+# Response MIME type by output extension (anything else: application/octet-stream)
+_MIME = {
+    ".pdf": "application/pdf",
+    ".docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    ".pptx": "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+    ".zip": "application/zip",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".png": "image/png",
+    ".webp": "image/webp",
+}
+
+# Map frontend option -> params: (jpeg_quality, scale, png_compress_level, gs_preset, gs_dpi, progressive JPEG,
+# try lossless qpdf before gs)
 OPTION_MAP = {
-    "low":     {"jpeg_q": 90, "scale": 1.0, "png_comp": 6,  "gs_preset": "/ebook",  "gs_dpi": 150},
-    "medium":  {"jpeg_q": 75, "scale": 0.95, "png_comp": 7, "gs_preset": "/screen", "gs_dpi": 100},
-    "high":    {"jpeg_q": 60, "scale": 0.8,  "png_comp": 9, "gs_preset": "/screen", "gs_dpi": 72},
-    "maximum": {"jpeg_q": 40, "scale": 0.6,  "png_comp": 9, "gs_preset": "/screen", "gs_dpi": 50},
+    "low":     {"jpeg_q": 90, "scale": 1.0, "png_comp": 6,  "gs_preset": "/ebook",  "gs_dpi": 150, "progressive": False, "pdf_lossless": True},
+    "medium":  {"jpeg_q": 75, "scale": 0.95, "png_comp": 7, "gs_preset": "/screen", "gs_dpi": 100, "progressive": False, "pdf_lossless": True},
+    "high":    {"jpeg_q": 60, "scale": 0.8,  "png_comp": 9, "gs_preset": "/screen", "gs_dpi": 72,  "progressive": True,  "pdf_lossless": False},
+    "maximum": {"jpeg_q": 40, "scale": 0.6,  "png_comp": 9, "gs_preset": "/screen", "gs_dpi": 50,  "progressive": True,  "pdf_lossless": False},
 }
 
+# ZIP members compressed in parallel (gs runs out of process and Pillow
+# releases the GIL, so threads suffice); Ghostscript is capped separately
+# because each gs process can use a lot of memory
+ZIP_WORKERS = os.cpu_count() or 1
+# Chunk size for ZIP member copies (shutil's default is 64 KiB)
+COPY_BUFSIZE = 1024 * 1024
+_GS_SLOTS = threading.BoundedSemaphore(min(ZIP_WORKERS, 4))
+
 def find_gs_executable() -> Optional[str]:
     return which("gswin64c") or which("gswin32c") or which("gs")
 
-def build_gs_command(gs_exec: str, inp: str, out: str, preset: str, dpi: int) -> List[str]:
-    cmd = [
-        gs_exec,
+# Looked up once at import; PATH doesn't change under a running server
+_GS_EXEC = find_gs_executable()
+
+@functools.lru_cache(maxsize=16)
+def build_gs_base_args(preset: str, dpi: int) -> Tuple[str, ...]:
+    """Options shared by every gs run for a preset/DPI (no exe, in or out)"""
+    args = [
         "-sDEVICE=pdfwrite",
         "-dCompatibilityLevel=1.4",
         "-dNOPAUSE",
@@ -122,32 +182,112 @@ def build_gs_command(gs_exec: str, inp: str, out: str, preset: str, dpi: int) ->
         "-dUseFlateCompression=true",
     ]
     if dpi > 0:
-        cmd.extend([
+        args.extend([
             f"-dColorImageResolution={dpi}",
             f"-dGrayImageResolution={dpi}",
             f"-dMonoImageResolution={dpi}",
         ])
+    return tuple(args)
+
+def build_gs_command(gs_exec: str, inp: str, out: str, preset: str, dpi: int) -> List[str]:
+    cmd = [gs_exec, *build_gs_base_args(preset, dpi)]
+    if out == "-":
+        # Keep gs's own messages off stdout, which carries the PDF
+        cmd.append("-sstdout=%stderr")
     cmd.extend([f"-sOutputFile={out}", inp])
     return cmd
 
-def run_gs_command(cmd: List[str]) -> None:
-    subprocess.run(cmd, check=True)
-
-def read_into_bytesio(path: Path) -> io.BytesIO:
-    bio = io.BytesIO()
-    with path.open("rb") as f:
-        shutil.copyfileobj(f, bio)
-    bio.seek(0)
-    return bio
+def run_gs_command(cmd: List[str], limit: Optional[int] = None) -> Optional[bytes]:
+    """
+    Run gs and return what it wrote to stdout (the PDF with -sOutputFile=-).
+    If the output grows past limit bytes gs is killed and None returned.
+    """
+    with subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL) as proc:
+        chunks = []
+        total = 0
+        while True:
+            chunk = proc.stdout.read(COPY_BUFSIZE)
+            if not chunk:
+                break
+            total += len(chunk)
+            if limit is not None and total > limit:
+                proc.kill()
+                return None
+            chunks.append(chunk)
+        if proc.wait() != 0:
+            raise subprocess.CalledProcessError(proc.returncode, cmd)
+    return b"".join(chunks)
 
 # ---------- Image compression helpers ----------
-def compress_image_file(input_path: Path, output_path: Path, jpeg_q: int, scale: float, png_comp: int) -> bool:
+# Re-encoded images are only kept when at most this fraction of the original
+MIN_SAVING_RATIO = 0.95
+
+class EncodeBudgetExceeded(Exception):
+    """Raised by CappedBuffer when an encode outgrows its budget."""
+
+class CappedBuffer(io.BytesIO):
+    """BytesIO that refuses to grow past limit bytes, aborting the encoder writing into it."""
+
+    def __init__(self, limit: int):
+        super().__init__()
+        self.limit = limit
+
+    def write(self, b) -> int:
+        if self.tell() + len(b) > self.limit:
+            raise EncodeBudgetExceeded()
+        return super().write(b)
+
+def write_if_smaller(input_path: Path, output_path: Path, data) -> None:
+    """
+    Write encoded data to output_path only if it is meaningfully smaller
+    than the original; otherwise output_path is left absent, which callers
+    treat as "keep the original".
+    """
+    if len(data) < input_path.stat().st_size * MIN_SAVING_RATIO:
+        output_path.write_bytes(data)
+
+def optimize_jpeg(data, progressive: bool):
+    """Run mozjpeg's lossless optimizer over encoded JPEG bytes (progressive presets only)."""
+    if not progressive or mozjpeg_lossless_optimization is None:
+        return data
+    try:
+        return mozjpeg_lossless_optimization.optimize(bytes(data))
+    except Exception as e:
+        app.logger.debug("mozjpeg optimize failed: %s", e)
+        return data
+
+def compress_jpeg_turbo(input_path: Path, output_path: Path, jpeg_q: int, progressive: bool = False) -> bool:
+    """
+    Recompress a JPEG at its original size with libjpeg-turbo.
+    Returns False if TurboJPEG is unavailable or can't handle the file
+    (e.g. CMYK), so the caller can fall back to Pillow.
+    """
+    if _tj is None:
+        return False
+    try:
+        arr = _tj.decode(input_path.read_bytes())
+        flags = TJFLAG_FASTDCT | (TJFLAG_PROGRESSIVE if progressive else 0)
+        data = _tj.encode(arr, quality=jpeg_q, jpeg_subsample=TJSAMP_420, flags=flags)
+    except Exception as e:
+        app.logger.debug("TurboJPEG failed for %s, using Pillow: %s", input_path, e)
+        return False
+    write_if_smaller(input_path, output_path, optimize_jpeg(data, progressive))
+    return True
+
+def compress_image_file(input_path: Path, output_path: Path, jpeg_q: int, scale: float, png_comp: int,
+                        progressive: bool = False) -> bool:
     """
     Compress a single image file and write to output_path.
-    Attempts to preserve format where feasible.
+    Attempts to preserve format where feasible. The image is encoded in
+    memory first; if that isn't smaller, output_path is not written and
+    the caller keeps the original.
+    progressive selects progressive (scan-optimized) JPEG output.
     Returns True on success.
     """
-    if Image is None:
+    if scale >= 1.0 and input_path.suffix.lower() in (".jpg", ".jpeg"):
+        if compress_jpeg_turbo(input_path, output_path, jpeg_q, progressive):
+            return True
+    if not _HAS_PIL:
         app.logger.error("Pillow is required to compress images.")
         return False
     try:
@@ -156,104 +296,175 @@ def compress_image_file(input_path: Path, output_path: Path, jpeg_q: int, scale:
             if scale < 1.0:
                 new_w = max(1, int(im.width * scale))
                 new_h = max(1, int(im.height * scale))
-                im = im.resize((new_w, new_h), Image.LANCZOS)
+                # JPEG: let libjpeg decode at a reduced DCT scale (1/2, 1/4,
+                # 1/8) when that still covers the target size; no-op otherwise
+                im.draft(None, (new_w, new_h))
+                # Box-reduce to within 3x of the target, then Lanczos
+                im.thumbnail((new_w, new_h), Image.LANCZOS, reducing_gap=3.0)
 
             fmt = (im.format or input_path.suffix.replace(".", "").upper()).upper()
+            # Give up on the encode once it can no longer beat the original
+            buf = CappedBuffer(int(input_path.stat().st_size * MIN_SAVING_RATIO))
             # For JPEG-like formats
             if fmt in ("JPEG", "JPG"):
                 im = im.convert("RGB")
-                im.save(str(output_path), format="JPEG", quality=jpeg_q, optimize=True)
+                im.save(buf, format="JPEG", quality=jpeg_q, optimize=True, progressive=progressive)
+                write_if_smaller(input_path, output_path, optimize_jpeg(buf.getbuffer(), progressive))
+                return True
             elif fmt in ("WEBP",):
                 im = im.convert("RGB")
-                im.save(str(output_path), format="WEBP", quality=jpeg_q, method=6)
+                im.save(buf, format="WEBP", quality=jpeg_q, method=6)
             elif fmt in ("PNG",):
                 # For PNG: save with optimize and provided compress level
                 # Pillow uses compress_level 0-9 (9 max compression)
-                params = {"optimize": True}
                 try:
-                    im.save(str(output_path), format="PNG", optimize=True, compress_level=png_comp)
+                    im.save(buf, format="PNG", optimize=True, compress_level=png_comp)
                 except TypeError:
                     # Some Pillow builds may not accept compress_level -> fallback
-                    im.save(str(output_path), format="PNG", optimize=True)
+                    buf.seek(0)
+                    buf.truncate()
+                    im.save(buf, format="PNG", optimize=True)
             elif fmt in ("TIFF","TIF"):
                 im = im.convert("RGB")
-                im.save(str(output_path), format="TIFF", quality=jpeg_q)
+                im.save(buf, format="TIFF", quality=jpeg_q)
             else:
                 # Unknown format - try to save as JPEG to reduce size, keep extension
                 try:
                     im = im.convert("RGB")
-                    im.save(str(output_path), format="JPEG", quality=jpeg_q, optimize=True)
+                    im.save(buf, format="JPEG", quality=jpeg_q, optimize=True)
                 except Exception:
-                    # fallback: copy original
-                    shutil.copyfile(str(input_path), str(output_path))
+                    # fallback: keep the original
+                    return True
+            write_if_smaller(input_path, output_path, buf.getbuffer())
             return True
+    except EncodeBudgetExceeded:
+        # Couldn't beat the original: keep it
+        return True
     except Exception as e:
         app.logger.exception("compress_image_file failed for %s: %s", input_path, e)
         return False
 
 # ---------- Office (docx/pptx) handlers ----------
-def compress_office_package(input_path: Path, output_path: Path, jpeg_q: int, scale: float, png_comp: int) -> bool:
+# Already-compressed media inside office packages; DEFLATE can't shrink these
+STORED_MEDIA_EXT = {".jpg", ".jpeg", ".png", ".webp", ".gif", ".wdp", ".mp4", ".mp3", ".m4a"}
+# Archive folders holding the images we recompress
+OFFICE_MEDIA_DIRS = {"word/media", "ppt/media", "media"}
+
+def zip_entry_kwargs(name: str) -> dict:
+    """Per-entry compression: media stored as-is, everything else deflated."""
+    if posixpath.splitext(name)[1].lower() in STORED_MEDIA_EXT:
+        return {"compress_type": zipfile.ZIP_STORED}
+    return {"compress_type": zipfile.ZIP_DEFLATED, "compresslevel": 6}
+
+def compress_office_media(zin: zipfile.ZipFile, info: zipfile.ZipInfo, src: Path, jpeg_q: int, scale: float,
+                          png_comp: int, progressive: bool) -> bytes:
+    """
+    Compressed bytes of one media entry (the original bytes if it can't be
+    compressed). src is a scratch path unique to this entry.
+    """
+    out_tmp = src.with_name(f"_tmp_{src.name}")
+    try:
+        with zin.open(info) as f, open(src, "wb") as dst:
+            shutil.copyfileobj(f, dst, COPY_BUFSIZE)
+        if compress_image_file(src, out_tmp, jpeg_q, scale, png_comp, progressive) and out_tmp.exists():
+            return out_tmp.read_bytes()
+        return src.read_bytes()
+    finally:
+        src.unlink(missing_ok=True)
+        out_tmp.unlink(missing_ok=True)
+
+def compress_office_package(input_path: Path, output_path: Path, jpeg_q: int, scale: float, png_comp: int,
+                            progressive: bool = False, media_workers: int = ZIP_WORKERS) -> bool:
     """
     Compress images inside a .docx or .pptx file.
-    - Unzip the archive
-    - For files under word/media or ppt/media, compress images
-    - Rezip to output_path
+    - Copy the archive entry by entry into output_path (no extraction)
+    - Files directly under word/media, ppt/media or media are compressed
+      as images, up to media_workers at once; only those touch the disk
     Returns True if output written.
     """
     try:
-        with tempfile.TemporaryDirectory() as work:
+        with tempfile.TemporaryDirectory() as work, \
+                zipfile.ZipFile(str(input_path), "r") as zin, \
+                zipfile.ZipFile(str(output_path), "w", compression=zipfile.ZIP_DEFLATED) as zout:
             workdir = Path(work)
-            # Extract zip (office files are zip archives)
-            with zipfile.ZipFile(str(input_path), "r") as zin:
-                zin.extractall(str(workdir))
-            # Possible media dirs
-            media_dirs = [workdir / "word" / "media", workdir / "ppt" / "media", workdir / "media"]
-            processed_any = False
-            for mdir in media_dirs:
-                if not mdir.exists():
-                    continue
-                for img in list(mdir.iterdir()):
-                    if not img.is_file():
-                        continue
-                    out_tmp = mdir / f"_tmp_{img.name}"
-                    ok = compress_image_file(img, out_tmp, jpeg_q, scale, png_comp)
-                    if ok and out_tmp.exists():
-                        # Replace original with compressed
-                        try:
-                            out_tmp.replace(img)
-                        except Exception:
-                            # fallback copy
-                            shutil.copyfile(str(out_tmp), str(img))
-                        processed_any = True
-            # Repack into output_path
-            with zipfile.ZipFile(str(output_path), "w", compression=zipfile.ZIP_DEFLATED) as zout:
-                for root, dirs, files in os.walk(workdir):
-                    for f in files:
-                        full = Path(root) / f
-                        # relative path inside archive
-                        rel = full.relative_to(workdir)
-                        zout.write(str(full), str(rel))
+            entries = [info for info in zin.infolist() if not info.is_dir()]
+            media = [info for info in entries if posixpath.dirname(info.filename) in OFFICE_MEDIA_DIRS]
+
+            # Media is compressed in parallel (Pillow/TurboJPEG release the
+            # GIL; ZipFile reads are safe across threads); entries are still
+            # written in their original order
+            with ThreadPoolExecutor(max_workers=max(1, min(media_workers, len(media)))) as pool:
+                pending = {
+                    info.filename: pool.submit(compress_office_media, zin, info,
+                                               workdir / f"{i}_{posixpath.basename(info.filename)}",
+                                               jpeg_q, scale, png_comp, progressive)
+                    for i, info in enumerate(media)
+                }
+                for info in entries:
+                    future = pending.get(info.filename)
+                    data = future.result() if future else zin.read(info)
+                    # Fresh ZipInfo keeps the name, timestamp and attributes
+                    # but none of the source entry's size/extra-field
+                    # bookkeeping
+                    out_info = zipfile.ZipInfo(info.filename, info.date_time)
+                    out_info.external_attr = info.external_attr
+                    zout.writestr(out_info, data, **zip_entry_kwargs(info.filename))
             return True
     except Exception as e:
         app.logger.exception("compress_office_package failed for %s: %s", input_path, e)
         return False
 
 # ---------- PDF compression ----------
+# The lossless rewrite is kept only if it saves at least this much
+PDF_LOSSLESS_MIN_SAVING = 0.10
+
+def compress_pdf_lossless(input_path: Path, output_path: Path) -> bool:
+    """
+    Rewrite a PDF with pikepdf/qpdf: recompress streams and pack objects
+    into object streams, without decoding any images.
+    Returns True if output written and it saved PDF_LOSSLESS_MIN_SAVING.
+    """
+    if pikepdf is None:
+        return False
+    try:
+        with pikepdf.open(str(input_path)) as pdf:
+            pdf.save(str(output_path), compress_streams=True, recompress_flate=True,
+                     object_stream_mode=pikepdf.ObjectStreamMode.generate)
+    except Exception as e:
+        app.logger.debug("pikepdf failed for %s, using Ghostscript: %s", input_path, e)
+        output_path.unlink(missing_ok=True)
+        return False
+    if output_path.stat().st_size > input_path.stat().st_size * (1 - PDF_LOSSLESS_MIN_SAVING):
+        output_path.unlink(missing_ok=True)
+        return False
+    return True
+
 def compress_pdf_with_ghostscript(input_path: Path, output_path: Path, preset: str, dpi: int) -> bool:
-    gs_exec = find_gs_executable()
-    if not gs_exec:
+    """
+    Compress a PDF with Ghostscript. gs writes the result to stdout, and
+    output_path is only written when it is smaller than the input.
+    Returns True if output written.
+    """
+    if not _GS_EXEC:
         app.logger.error("Ghostscript not found.")
         return False
-    cmd = build_gs_command(gs_exec, str(input_path), str(output_path), preset, dpi)
+    cmd = build_gs_command(_GS_EXEC, str(input_path), "-", preset, dpi)
+    orig_size = input_path.stat().st_size
     try:
-        run_gs_command(cmd)
-        return output_path.exists()
+        with _GS_SLOTS:
+            # Stop gs as soon as its output is no longer smaller
+            data = run_gs_command(cmd, limit=orig_size - 1)
     except Exception as e:
         app.logger.exception("Ghostscript failed for %s: %s", input_path, e)
         return False
+    if not data:
+        return False
+    output_path.write_bytes(data)
+    return True
 
 # ---------- Top-level processing ----------
-def process_single_file(input_path: Path, option: str, tmpdir: Path) -> Tuple[Path, str]:
+def process_single_file(input_path: Path, option: str, tmpdir: Path,
+                        media_workers: int = ZIP_WORKERS) -> Tuple[Path, str]:
     """
     Process a single file and return (output_path, method).
     IMPORTANT: This function ALWAYS preserves the original file type/extension.
@@ -261,16 +472,23 @@ def process_single_file(input_path: Path, option: str, tmpdir: Path) -> Tuple[Pa
     - DOCX in -> DOCX out (compressed)
     - PPTX in -> PPTX out (compressed)
     - Image in -> Same format image out (compressed)
-    method is one of "gs", "office", "image", "original"
+    method is one of "qpdf", "gs", "office", "image", "original"
+    media_workers caps parallel image compression inside DOCX/PPTX; callers
+    already running in a pool pass 1.
     """
     opt = OPTION_MAP.get(option, OPTION_MAP["medium"])
     jpeg_q = opt["jpeg_q"]; scale = opt["scale"]; png_comp = opt["png_comp"]; gs_preset = opt["gs_preset"]; gs_dpi = opt["gs_dpi"]
+    progressive = opt["progressive"]
 
     suffix = input_path.suffix.lower().lstrip(".")
     
     # PDF -> compressed PDF (same extension)
     if suffix == "pdf":
         out_pdf = tmpdir / f"{input_path.stem}_compressed.pdf"
+        # Cheap lossless pass first on the lighter presets; gs only if it
+        # doesn't save enough
+        if opt["pdf_lossless"] and compress_pdf_lossless(input_path, out_pdf):
+            return (out_pdf, "qpdf")
         ok = compress_pdf_with_ghostscript(input_path, out_pdf, gs_preset, gs_dpi)
         if ok and out_pdf.exists() and out_pdf.stat().st_size < input_path.stat().st_size:
             return (out_pdf, "gs")
@@ -281,7 +499,7 @@ def process_single_file(input_path: Path, option: str, tmpdir: Path) -> Tuple[Pa
     elif suffix in ("docx", "pptx"):
         # CRITICAL: Output file maintains the same extension as input
         out_file = tmpdir / f"{input_path.stem}_compressed.{suffix}"
-        ok = compress_office_package(input_path, out_file, jpeg_q, scale, png_comp)
+        ok = compress_office_package(input_path, out_file, jpeg_q, scale, png_comp, progressive, media_workers)
         if ok and out_file.exists() and out_file.stat().st_size < input_path.stat().st_size:
             return (out_file, "office")
         elif ok and out_file.exists():
@@ -291,10 +509,10 @@ def process_single_file(input_path: Path, option: str, tmpdir: Path) -> Tuple[Pa
             return (input_path, "original")
     
     # Images -> compressed images (same format/extension preserved)
-    elif suffix in ("jpg", "jpeg", "png", "webp", "tif", "tiff", "bmp"):
+    elif suffix in IMAGE_EXT:
         # CRITICAL: Output maintains the same extension as input (e.g., .png -> .png)
         out_img = tmpdir / f"{input_path.stem}_compressed{input_path.suffix}"
-        ok = compress_image_file(input_path, out_img, jpeg_q, scale, png_comp)
+        ok = compress_image_file(input_path, out_img, jpeg_q, scale, png_comp, progressive)
         if ok and out_img.exists():
             return (out_img, "image")
         else:
@@ -313,8 +531,8 @@ def index():
 def health():
     return jsonify({
         "ok": True,
-        "ghostscript": bool(find_gs_executable()),
-        "pillow": Image is not None
+        "ghostscript": bool(_GS_EXEC),
+        "pillow": _HAS_PIL
     })
 
 @app.route("/compress", methods=["POST", "OPTIONS"])
@@ -337,120 +555,128 @@ def compress_endpoint():
     if option not in OPTION_MAP:
         option = "medium"
 
-    with tempfile.TemporaryDirectory() as tmp:
-        tmpdir = Path(tmp)
-        upload_path = tmpdir / filename
-        uploaded.save(str(upload_path))
-        orig_size = upload_path.stat().st_size
-
-        # ZIP handling
-        if upload_path.suffix.lower() == ".zip":
-            extracted = tmpdir / "extracted"
-            extracted.mkdir(parents=True, exist_ok=True)
-            try:
-                with zipfile.ZipFile(str(upload_path), "r") as z:
-                    for member in z.namelist():
-                        if member.endswith("/"):
-                            continue
-                        safe_name = secure_filename(member)
-                        if not safe_name:
-                            continue
-                        target = extracted / safe_name
-                        target.parent.mkdir(parents=True, exist_ok=True)
-                        with z.open(member) as src, open(target, "wb") as dst:
-                            shutil.copyfileobj(src, dst)
-            except zipfile.BadZipFile:
-                return abort(400, "Uploaded file is not a valid ZIP archive.")
-
-            processed: List[Tuple[str, Path]] = []
-            found_any = False
-            for root, _, files in os.walk(extracted):
-                for fname in files:
+    # Images too small to gain anything go straight back without touching
+    # the disk. The upload stream is closed with the request, before the
+    # body is sent, so send a copy of its (small) contents. .doc/.ppt take
+    # the tmpdir path below and come back unchanged
+    ext = filename.rsplit(".", 1)[1].lower()
+    # Chunked/unknown-length bodies could be any size: never take this path
+    if ext in IMAGE_EXT and request.content_length is not None and request.content_length < SMALL_IMAGE_BYTES:
+        data = uploaded.stream.read()
+        resp = make_response(send_file(io.BytesIO(data), as_attachment=True, download_name=filename,
+                                       mimetype="application/octet-stream"))
+        resp.headers["X-Final-Size"] = str(len(data))
+        resp.headers["X-Returned"] = "original"
+        resp.headers["X-Method"] = "original"
+        return resp
+
+    # The response streams straight from a file in tmp, so tmp lives until
+    # the response is closed rather than until this function returns
+    tmp = tempfile.mkdtemp()
+    try:
+        resp = compress_upload(uploaded, filename, option, Path(tmp))
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    resp.call_on_close(lambda: shutil.rmtree(tmp, ignore_errors=True))
+    return resp
+
+def compress_upload(uploaded, filename: str, option: str, tmpdir: Path):
+    """Save the upload into tmpdir, compress it and build the file response."""
+    upload_path = tmpdir / filename
+    save_upload(uploaded, str(upload_path))
+    orig_size = upload_path.stat().st_size
+
+    # ZIP handling
+    if upload_path.suffix.lower() == ".zip":
+        # Members are spilled to disk only while being compressed and
+        # written straight into the result ZIP (no extracted tree, no
+        # results/ staging copy). Up to ZIP_WORKERS are compressed at
+        # once; results are written in archive order.
+        work = tmpdir / "work"
+        work.mkdir(parents=True, exist_ok=True)
+        result_zip = tmpdir / "compressed_results.zip"
+        found_any = False
+
+        def write_result(outzip, member_dir, safe_name, future):
+            out_path, method = future.result()
+            # Original filename in the output ZIP; the extension is
+            # ALWAYS preserved from the input
+            outzip.write(str(out_path), safe_name)
+            shutil.rmtree(member_dir, ignore_errors=True)
+
+        try:
+            with zipfile.ZipFile(str(upload_path), "r") as z, \
+                    zipfile.ZipFile(str(result_zip), "w", compression=zipfile.ZIP_DEFLATED) as outzip, \
+                    ThreadPoolExecutor(max_workers=ZIP_WORKERS) as pool:
+                seen = set()
+                inflight = deque()
+                for index, info in enumerate(z.infolist()):
+                    if info.is_dir():
+                        continue
+                    safe_name = secure_filename(info.filename)
+                    if not safe_name or safe_name in seen:
+                        continue
+                    seen.add(safe_name)
                     found_any = True
-                    in_path = Path(root) / fname
-                    out_path, method = process_single_file(in_path, option, tmpdir)
-                    
-                    # Preserve original filename structure in the output ZIP
-                    # Use original filename (without _compressed suffix) for cleaner output
-                    original_name = in_path.name
-                    final_dest = tmpdir / "results" / original_name
-                    final_dest.parent.mkdir(parents=True, exist_ok=True)
-                    
-                    # Copy the processed (or original) file to results directory
-                    # File extension is ALWAYS preserved from the input
-                    if out_path.resolve() == in_path.resolve():
-                        # File wasn't compressed, use original
-                        shutil.copyfile(str(in_path), str(final_dest))
-                    else:
-                        # File was compressed, but extension is preserved
-                        shutil.copyfile(str(out_path), str(final_dest))
-                    
-                    processed.append((final_dest.name, final_dest))
-
-            if not found_any:
-                return abort(400, "No files found inside the uploaded ZIP.")
-
-            result_zip = tmpdir / "compressed_results.zip"
-            with zipfile.ZipFile(str(result_zip), "w", compression=zipfile.ZIP_DEFLATED) as outzip:
-                for arcname, path in processed:
-                    outzip.write(str(path), arcname)
-
-            # If compressed zip isn't smaller, still return it (user requested compressed office files); but we'll compare and choose
-            result_size = result_zip.stat().st_size
-            # If result is larger than original zip, still return processed zip because user expects processed outputs
-            bio = read_into_bytesio(result_zip)
-            resp = make_response(send_file(bio, as_attachment=True, download_name="compressed_results.zip", mimetype="application/zip"))
-            resp.headers["X-Final-Size"] = str(result_size)
-            resp.headers["X-Returned"] = "compressed"
-            resp.headers["X-Method"] = "zip"
-            return resp
 
-        # Single-file processing
+                    # Each member gets its own folder: concurrent members
+                    # must not see each other's *_compressed outputs
+                    member_dir = work / str(index)
+                    member_dir.mkdir()
+                    in_path = member_dir / safe_name
+                    with z.open(info) as src, open(in_path, "wb") as dst:
+                        shutil.copyfileobj(src, dst, COPY_BUFSIZE)
+                    inflight.append((member_dir, safe_name, pool.submit(process_single_file, in_path, option, member_dir, 1)))
+                    if len(inflight) >= ZIP_WORKERS:
+                        write_result(outzip, *inflight.popleft())
+                while inflight:
+                    write_result(outzip, *inflight.popleft())
+        except zipfile.BadZipFile:
+            return abort(400, "Uploaded file is not a valid ZIP archive.")
+
+        if not found_any:
+            return abort(400, "No files found inside the uploaded ZIP.")
+
+        # If compressed zip isn't smaller, still return it (user requested compressed office files); but we'll compare and choose
+        result_size = result_zip.stat().st_size
+        # If result is larger than original zip, still return processed zip because user expects processed outputs
+        resp = make_response(send_file(str(result_zip), as_attachment=True, download_name="compressed_results.zip",
+                                       mimetype="application/zip", conditional=True))
+        resp.headers["X-Final-Size"] = str(result_size)
+        resp.headers["X-Returned"] = "compressed"
+        resp.headers["X-Method"] = "zip"
+        return resp
+
+    # Single-file processing
+    else:
+        out_path, method = process_single_file(upload_path, option, tmpdir)
+
+        # Prepare download name - use original filename to preserve clarity
+        # Extension is ALWAYS the same as the input file
+        original_filename = upload_path.name
+
+        # If output is identical to input and method == original, return original file
+        if out_path.resolve() == upload_path.resolve():
+            # return original file with original name
+            resp = make_response(send_file(str(upload_path), as_attachment=True, download_name=original_filename,
+                                           mimetype="application/octet-stream", conditional=True))
+            resp.headers["X-Final-Size"] = str(upload_path.stat().st_size)
+            resp.headers["X-Returned"] = "original"
+            resp.headers["X-Method"] = "original"
+            return resp
         else:
-            out_path, method = process_single_file(upload_path, option, tmpdir)
-            
-            # Prepare download name - use original filename to preserve clarity
-            # Extension is ALWAYS the same as the input file
-            original_filename = upload_path.name
-            
-            # If output is identical to input and method == original, return original file
-            if out_path.resolve() == upload_path.resolve():
-                # return original file with original name
-                bio = read_into_bytesio(upload_path)
-                resp = make_response(send_file(bio, as_attachment=True, download_name=original_filename, mimetype="application/octet-stream"))
-                resp.headers["X-Final-Size"] = str(upload_path.stat().st_size)
-                resp.headers["X-Returned"] = "original"
-                resp.headers["X-Method"] = "original"
-                return resp
-            else:
-                # Return compressed file with ORIGINAL filename (preserving extension)
-                # Extension is guaranteed to match the input file type
-                download_name = original_filename  # Use original name, not _compressed version
-                mime = "application/octet-stream"
-                lower = out_path.suffix.lower()
-                
-                # Set appropriate MIME type based on file extension
-                if lower == ".pdf":
-                    mime = "application/pdf"
-                elif lower in (".docx",):
-                    mime = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-                elif lower in (".pptx",):
-                    mime = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
-                elif lower in (".zip",):
-                    mime = "application/zip"
-                elif lower.startswith(".jpg") or lower.startswith(".jpeg"):
-                    mime = "image/jpeg"
-                elif lower == ".png":
-                    mime = "image/png"
-                elif lower == ".webp":
-                    mime = "image/webp"
-                
-                bio = read_into_bytesio(out_path)
-                resp = make_response(send_file(bio, as_attachment=True, download_name=download_name, mimetype=mime))
-                resp.headers["X-Final-Size"] = str(out_path.stat().st_size)
-                resp.headers["X-Returned"] = "compressed"
-                resp.headers["X-Method"] = method
-                return resp
+            # Return compressed file with ORIGINAL filename (preserving extension)
+            # Extension is guaranteed to match the input file type
+            download_name = original_filename  # Use original name, not _compressed version
+            mime = _MIME.get(out_path.suffix.lower(), "application/octet-stream")
+
+            resp = make_response(send_file(str(out_path), as_attachment=True, download_name=download_name,
+                                           mimetype=mime, conditional=True))
+            resp.headers["X-Final-Size"] = str(out_path.stat().st_size)
+            resp.headers["X-Returned"] = "compressed"
+            resp.headers["X-Method"] = method
+            return resp
 
 @app.errorhandler(413)
 def too_large(e):
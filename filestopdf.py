@@ -16,16 +16,19 @@ Usage (recommended on Windows):
  Install Microsoft Word OR LibreOffice (soffice) for fallbacks.
 """
 import os
+import functools
 import zipfile
 import tempfile
 import shutil
 import subprocess
 import platform
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from flask import Flask, request, send_file, jsonify
+from flask import Flask, request, send_file, jsonify, make_response
 from werkzeug.utils import secure_filename
 from PIL import Image
 from flask_cors import CORS
+from utils.helpers import save_upload, soffice_profile
 
 # docx2pdf and win32com are optional; import if available
 DOCX2PDF_AVAILABLE = False
@@ -54,10 +57,16 @@ ALLOWED_EXTS = {
     '.txt', '.pdf'
 }
 
+# ZIP members converted at once; each conversion is its own soffice/gs/...
+# process, so threads are enough. Capped because every soffice is ~100 MB+
+CONVERT_WORKERS = min(os.cpu_count() or 1, 8)
+
 
 # ---------------- utilities ----------------
 
+@functools.lru_cache(maxsize=None)
 def which_binary(name: str):
+    # PATH doesn't change while the server runs; look each tool up once
     from shutil import which
     return which(name)
 
@@ -80,14 +89,50 @@ def run_soffice_convert_to_pdf(src: Path, outdir: Path):
     soffice = which_binary("soffice") or which_binary("soffice.exe")
     if not soffice:
         return None, "soffice not found in PATH"
-    cmd = [soffice, "--headless", "--convert-to", "pdf", "--outdir", str(outdir), str(src)]
-    rc, out, err = run_subprocess(cmd)
+    with soffice_profile() as profile:
+        cmd = [soffice, profile, "--headless", "--convert-to", "pdf", "--outdir", str(outdir), str(src)]
+        rc, out, err = run_subprocess(cmd)
     expected = outdir / (src.stem + ".pdf")
     if expected.exists():
         return expected, f"soffice ok (rc={rc})"
     return None, f"soffice failed (rc={rc}) stdout={out[:400]} stderr={err[:400]}"
 
 
+def run_soffice_convert_many_to_pdf(srcs, outdir: Path):
+    """
+    Convert several files to PDF with one soffice launch, since startup
+    dominates most conversions. Returns {src: (Path or None, details)}.
+    soffice names each output <stem>.pdf, so files whose stems collide go
+    to a later launch writing into its own subdirectory of outdir.
+    """
+    soffice = which_binary("soffice") or which_binary("soffice.exe")
+    if not soffice:
+        return {src: (None, "soffice not found in PATH") for src in srcs}
+    results = {}
+    pending = list(srcs)
+    round_no = 0
+    while pending:
+        batch, rest, stems = [], [], set()
+        for src in pending:
+            key = src.stem.lower()
+            (rest if key in stems else batch).append(src)
+            stems.add(key)
+        batch_dir = outdir if round_no == 0 else outdir / f"batch{round_no}"
+        batch_dir.mkdir(parents=True, exist_ok=True)
+        with soffice_profile() as profile:
+            cmd = [soffice, profile, "--headless", "--convert-to", "pdf", "--outdir", str(batch_dir)]
+            rc, out, err = run_subprocess(cmd + [str(src) for src in batch])
+        for src in batch:
+            expected = batch_dir / (src.stem + ".pdf")
+            if expected.exists():
+                results[src] = (expected, f"soffice ok (rc={rc}, {len(batch)} file(s) per launch)")
+            else:
+                results[src] = (None, f"soffice failed (rc={rc}) stdout={out[:400]} stderr={err[:400]}")
+        pending = rest
+        round_no += 1
+    return results
+
+
 def try_docx2pdf_windows(src: Path, out_pdf: Path):
     if not DOCX2PDF_AVAILABLE:
         return None, "docx2pdf package not available"
@@ -174,12 +219,38 @@ def image_to_pdf(src: Path, out_pdf: Path):
         return None, f"Pillow error: {e}"
 
 
+def soffice_is_first_choice(suffix: str) -> bool:
+    """True if convert_one_to_pdf would go straight to soffice for this type."""
+    if suffix in (".ppt", ".pptx", ".xls", ".xlsx", ".txt"):
+        return True
+    if suffix in (".doc", ".docx"):
+        on_windows_com = platform.system().lower() == "windows" and WIN32COM_AVAILABLE
+        return not DOCX2PDF_AVAILABLE and not on_windows_com
+    return False
+
+
+def convert_batch_to_pdf(srcs, outdir: Path):
+    """
+    run_soffice_convert_many_to_pdf, then convert each file the batch didn't
+    produce on its own, so one document that crashes soffice doesn't fail
+    the rest of its batch.
+    """
+    results = run_soffice_convert_many_to_pdf(srcs, outdir)
+    for i, src in enumerate(srcs):
+        res, det = results[src]
+        if res is None:
+            retry, retry_det = convert_one_to_pdf(src, outdir / f"retry_{i}")
+            results[src] = (retry, retry_det if retry else f"batch: {det}; alone: {retry_det}")
+    return results
+
+
 def convert_one_to_pdf(src: Path, working_dir: Path):
     """
     Convert one source file to PDF, returns (Path or None, details string).
     Improved DOCX path: docx2pdf -> pywin32 -> soffice
     """
     suffix = src.suffix.lower()
+    working_dir.mkdir(parents=True, exist_ok=True)
     out_pdf = working_dir / (src.stem + ".pdf")
 
     if suffix in (".jpg", ".jpeg", ".png", ".webp"):
@@ -228,8 +299,12 @@ def convert_one_to_pdf(src: Path, working_dir: Path):
 
     if suffix == ".pdf":
         dst = working_dir / src.name
-        shutil.copy(str(src), str(dst))
-        return dst, "pdf passthrough (copied)"
+        try:
+            os.link(src, dst)  # same filesystem: no byte copy
+            return dst, "pdf passthrough (linked)"
+        except OSError:
+            shutil.copy(str(src), str(dst))
+            return dst, "pdf passthrough (copied)"
 
     return None, f"unsupported suffix: {suffix}"
 
@@ -264,68 +339,97 @@ def file_pdf():
     if not (suffix in ALLOWED_EXTS or filename.lower().endswith(".zip")):
         return jsonify({"error": f"unsupported file type: {filename}"}), 400
 
+    # Results are sent straight from files in tmp_root, so it lives until the
+    # response is closed rather than until this function returns
     tmp_root = Path(tempfile.mkdtemp(prefix="conv_"))
     try:
-        upload_path = tmp_root / filename
-        uploaded.save(str(upload_path))
-
-        # ZIP handling: extract and convert all supported files
-        if filename.lower().endswith(".zip"):
-            extracted = tmp_root / "extracted"
-            extracted.mkdir(parents=True, exist_ok=True)
-            try:
-                with zipfile.ZipFile(upload_path, "r") as zin:
-                    zin.extractall(path=str(extracted))
-            except zipfile.BadZipFile:
-                return jsonify({"error": "invalid zip archive"}), 400
-
-            outdir = tmp_root / "outputs"
-            outdir.mkdir(parents=True, exist_ok=True)
-            outputs = []
-            details_map = {}
-
-            for root, _, files in os.walk(extracted):
-                for name in files:
-                    src = Path(root) / name
-                    ext = Path(name).suffix.lower()
-                    if ext not in ALLOWED_EXTS:
-                        details_map[str(src.relative_to(extracted))] = "skipped-unsupported"
-                        continue
-                    res, det = convert_one_to_pdf(src, outdir)
-                    details_map[str(src.relative_to(extracted))] = det
-                    if res and res.exists():
-                        outputs.append(res)
-
-            if not outputs:
-                return jsonify({"error": "no convertible files in zip", "details": details_map}), 400
-
-            # if single output -> return pdf directly
-            if len(outputs) == 1:
-                p = outputs[0]
-                return send_file(str(p), as_attachment=True, download_name=p.name, mimetype="application/pdf")
-
-            # else pack into zip
-            outzip = tmp_root / "converted_pdfs.zip"
-            with zipfile.ZipFile(outzip, "w", compression=zipfile.ZIP_DEFLATED) as zout:
-                for p in outputs:
-                    zout.write(p, arcname=p.name)
-            # also return details in header? (we return zip directly as before)
-            return send_file(str(outzip), as_attachment=True, download_name="converted_pdfs.zip", mimetype="application/zip")
-
-        else:
-            outdir = tmp_root / "outputs"
-            outdir.mkdir(parents=True, exist_ok=True)
-            res, det = convert_one_to_pdf(upload_path, outdir)
-            if not res:
-                return jsonify({"error": "conversion failed or unsupported file type", "details": det}), 500
-            return send_file(str(res), as_attachment=True, download_name=res.name, mimetype="application/pdf")
-
-    finally:
-        # best-effort cleanup
+        resp = make_response(convert_upload_to_pdf(uploaded, filename, tmp_root))
+    except BaseException:
+        shutil.rmtree(tmp_root, ignore_errors=True)
+        raise
+    resp.call_on_close(lambda: shutil.rmtree(tmp_root, ignore_errors=True))
+    return resp
+
+
+def convert_upload_to_pdf(uploaded, filename: str, tmp_root: Path):
+    """Save the upload into tmp_root, convert it and build the response."""
+    upload_path = tmp_root / filename
+    save_upload(uploaded, str(upload_path))
+
+    # ZIP handling: extract and convert all supported files
+    if filename.lower().endswith(".zip"):
+        extracted = tmp_root / "extracted"
+        extracted.mkdir(parents=True, exist_ok=True)
+        outdir = tmp_root / "outputs"
+        outdir.mkdir(parents=True, exist_ok=True)
+        outputs = []
+        details_map = {}
+
+        # Only extract members we can convert; the rest are never written
+        candidates = []
         try:
-            shutil.rmtree(tmp_root)
-        except Exception:
-            pass
+            with zipfile.ZipFile(upload_path, "r") as zin:
+                for info in zin.infolist():
+                    if info.is_dir():
+                        continue
+                    if Path(info.filename).suffix.lower() not in ALLOWED_EXTS:
+                        details_map[info.filename] = "skipped-unsupported"
+                        continue
+                    src = Path(zin.extract(info, path=str(extracted)))
+                    candidates.append(src)
+        except zipfile.BadZipFile:
+            return jsonify({"error": "invalid zip archive"}), 400
+
+        # Files that would go straight to soffice are split into one
+        # batch (one soffice launch) per worker; the rest convert one by
+        # one. Every job writes to its own folder so equal stems don't clash
+        batchable = [src for src in candidates if soffice_is_first_choice(src.suffix.lower())]
+        singles = [src for src in candidates if not soffice_is_first_choice(src.suffix.lower())]
+        batches = [batchable[i::CONVERT_WORKERS] for i in range(CONVERT_WORKERS) if batchable[i::CONVERT_WORKERS]]
+        converted = {}
+        with ThreadPoolExecutor(max_workers=CONVERT_WORKERS) as pool:
+            batch_futures = [
+                pool.submit(convert_batch_to_pdf, batch, outdir / f"batch_{i}")
+                for i, batch in enumerate(batches)
+            ]
+            single_futures = {
+                src: pool.submit(convert_one_to_pdf, src, outdir / f"file_{i}")
+                for i, src in enumerate(singles)
+            }
+            for fut in batch_futures:
+                converted.update(fut.result())
+            for src, fut in single_futures.items():
+                converted[src] = fut.result()
+        for src in candidates:
+            res, det = converted[src]
+            details_map[str(src.relative_to(extracted))] = det
+            if res and res.exists():
+                outputs.append(res)
+
+        if not outputs:
+            return jsonify({"error": "no convertible files in zip", "details": details_map}), 400
+
+        # if single output -> return pdf directly
+        if len(outputs) == 1:
+            p = outputs[0]
+            return send_file(str(p), as_attachment=True, download_name=p.name, mimetype="application/pdf")
+
+        # else pack into zip
+        outzip = tmp_root / "converted_pdfs.zip"
+        # PDFs are already compressed; deflating them again gains ~nothing
+        with zipfile.ZipFile(outzip, "w", compression=zipfile.ZIP_STORED) as zout:
+            for p in outputs:
+                zout.write(p, arcname=p.name)
+        # also return details in header? (we return zip directly as before)
+        return send_file(str(outzip), as_attachment=True, download_name="converted_pdfs.zip", mimetype="application/zip")
+
+    else:
+        outdir = tmp_root / "outputs"
+        outdir.mkdir(parents=True, exist_ok=True)
+        res, det = convert_one_to_pdf(upload_path, outdir)
+        if not res:
+            return jsonify({"error": "conversion failed or unsupported file type", "details": det}), 500
+        return send_file(str(res), as_attachment=True, download_name=res.name, mimetype="application/pdf")
 
 
 if __name__ == "__main__":
@@ -2,18 +2,21 @@
 import io
 import os
 import sys
+import textwrap
 import zipfile
 import tempfile
 import shutil
+import struct
 import subprocess
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from flask import Flask, request, make_response, jsonify
+from flask import Flask, request, make_response, jsonify, send_file
 from flask_cors import CORS
 from pptx import Presentation
-from pptx.util import Inches
 import fitz  # PyMuPDF
 from PIL import Image, ImageDraw, ImageFont
+from utils.helpers import save_upload, soffice_profile
 
 app = Flask(__name__)
 CORS(app, resources={r"/*": {"origins": "*"}})
@@ -24,6 +27,13 @@ SUPPORTED_SINGLE = {
     '.html', '.htm', '.jpg', '.jpeg', '.png', '.webp', '.txt'
 }
 
+# PDF pages are embedded as JPEG: encoding is several times faster than PNG
+# and the slides come out far smaller
+SLIDE_JPEG_QUALITY = 85
+
+# ZIP members converted at once (each LibreOffice launch is its own process)
+CONVERT_WORKERS = min(os.cpu_count() or 1, 8)
+
 # Utilities -------------------------------------------------------------------
 
 def which_bin(name):
@@ -42,8 +52,9 @@ def run_soffice_convert(input_path: str, output_dir: str):
     if not SOFFICE_BIN:
         raise RuntimeError("LibreOffice (soffice) not found on PATH. Install LibreOffice.")
     # LibreOffice converts to output_dir with --convert-to pdf --outdir
-    cmd = [SOFFICE_BIN, '--headless', '--convert-to', 'pdf:writer_pdf_Export', '--outdir', output_dir, input_path]
-    subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    with soffice_profile() as profile:
+        cmd = [SOFFICE_BIN, profile, '--headless', '--convert-to', 'pdf:writer_pdf_Export', '--outdir', output_dir, input_path]
+        subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
     # find produced pdf in output_dir
     base = os.path.splitext(os.path.basename(input_path))[0]
     pdf_path = os.path.join(output_dir, base + '.pdf')
@@ -55,6 +66,33 @@ def run_soffice_convert(input_path: str, output_dir: str):
         raise RuntimeError(f"LibreOffice did not produce PDF for {input_path}")
     return pdf_path
 
+def run_soffice_convert_many(input_paths, output_dir: str):
+    """
+    Convert several documents to PDF with one LibreOffice launch instead of
+    one per file. Returns {input_path: pdf_path or None}. Inputs whose base
+    names collide are converted by a later launch into a subfolder.
+    """
+    results = {}
+    pending = list(input_paths)
+    round_no = 0
+    while pending and SOFFICE_BIN:
+        batch, rest, bases = [], [], set()
+        for path in pending:
+            base = os.path.splitext(os.path.basename(path))[0].lower()
+            (rest if base in bases else batch).append(path)
+            bases.add(base)
+        batch_dir = output_dir if round_no == 0 else os.path.join(output_dir, f'batch{round_no}')
+        os.makedirs(batch_dir, exist_ok=True)
+        with soffice_profile() as profile:
+            cmd = [SOFFICE_BIN, profile, '--headless', '--convert-to', 'pdf:writer_pdf_Export', '--outdir', batch_dir]
+            subprocess.run(cmd + batch, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        for path in batch:
+            pdf_path = os.path.join(batch_dir, os.path.splitext(os.path.basename(path))[0] + '.pdf')
+            results[path] = pdf_path if os.path.exists(pdf_path) else None
+        pending = rest
+        round_no += 1
+    return results
+
 def run_wkhtmltopdf(input_path: str, output_pdf: str):
     """Use wkhtmltopdf if installed (for HTML -> PDF)."""
     if not WKHTMLTOPDF_BIN:
@@ -66,6 +104,15 @@ def run_wkhtmltopdf(input_path: str, output_pdf: str):
 
 # Conversion helpers ----------------------------------------------------------
 
+EMU_PER_PX = 914400 // 96  # pictures are sized as 96 DPI
+
+def add_fitted_picture(slide, img_stream, px_w, px_h, slide_w, slide_h):
+    """Add the image to slide, scaled to fit and centred. Sizes in EMU ints."""
+    img_w, img_h = px_w * EMU_PER_PX, px_h * EMU_PER_PX
+    scale = min(slide_w / img_w, slide_h / img_h)
+    pic_w, pic_h = int(img_w * scale), int(img_h * scale)
+    slide.shapes.add_picture(img_stream, (slide_w - pic_w) // 2, (slide_h - pic_h) // 2, width=pic_w, height=pic_h)
+
 def pdf_bytes_to_pptx_bytes(pdf_bytes: bytes):
     """
     Convert PDF bytes to a PPTX bytes.
@@ -73,56 +120,60 @@ def pdf_bytes_to_pptx_bytes(pdf_bytes: bytes):
     """
     doc = fitz.open(stream=pdf_bytes, filetype='pdf')
     prs = Presentation()
-    # for each page rasterize to PNG and add as picture to slide
+    slide_layout = prs.slide_layouts[6]  # blank
+    slide_w, slide_h = prs.slide_width, prs.slide_height
+    # choose zoom for reasonable quality (tweak if needed)
+    zoom = 2  # 2 -> 144 DPI (72*2)
+    mat = fitz.Matrix(zoom, zoom)
+    # for each page rasterize to JPEG and add as picture to slide
     for i in range(doc.page_count):
         page = doc.load_page(i)
-        # choose zoom for reasonable quality (tweak if needed)
-        zoom = 2  # 2 -> 144 DPI (72*2)
-        mat = fitz.Matrix(zoom, zoom)
         pix = page.get_pixmap(matrix=mat, alpha=False)
-        img_bytes = pix.tobytes(output='png')
-        slide_layout = prs.slide_layouts[6]  # blank
+        img_bytes = pix.tobytes(output='jpeg', jpg_quality=SLIDE_JPEG_QUALITY)
         slide = prs.slides.add_slide(slide_layout)
-
-        img_stream = io.BytesIO(img_bytes)
-        # measure image size in pixels
-        img = Image.open(io.BytesIO(img_bytes))
-        px_w, px_h = img.size
-        dpi = 96.0
-        width_in = px_w / dpi
-        height_in = px_h / dpi
-        prs_w_in = prs.slide_width / 914400.0
-        prs_h_in = prs.slide_height / 914400.0
-        scale = min(prs_w_in / width_in, prs_h_in / height_in)
-        pic_w_in = width_in * scale
-        pic_h_in = height_in * scale
-        left_in = (prs_w_in - pic_w_in) / 2
-        top_in = (prs_h_in - pic_h_in) / 2
-        slide.shapes.add_picture(img_stream, Inches(left_in), Inches(top_in), width=Inches(pic_w_in), height=Inches(pic_h_in))
+        # image size in pixels, straight from the pixmap
+        add_fitted_picture(slide, io.BytesIO(img_bytes), pix.width, pix.height, slide_w, slide_h)
     out = io.BytesIO()
     prs.save(out)
     out.seek(0)
     doc.close()
     return out.read()
 
+def _probe_dims(img_bytes: bytes):
+    """
+    Return (width, height) read from a PNG IHDR or JPEG SOFn header, or None
+    for other formats. Saves going through PIL just for the size.
+    """
+    if img_bytes[:8] == b'\x89PNG\r\n\x1a\n' and len(img_bytes) >= 24:
+        return struct.unpack('>II', img_bytes[16:24])
+    if img_bytes[:2] == b'\xff\xd8':
+        pos = 2
+        while pos + 9 <= len(img_bytes):
+            if img_bytes[pos] != 0xFF:
+                return None
+            marker = img_bytes[pos + 1]
+            if marker == 0xFF:  # fill byte
+                pos += 1
+                continue
+            if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                h, w = struct.unpack('>HH', img_bytes[pos + 5:pos + 9])
+                return w, h
+            pos += 2 + struct.unpack('>H', img_bytes[pos + 2:pos + 4])[0]
+    return None
+
 def image_bytes_to_pptx_bytes(img_bytes: bytes, img_name: str = 'image'):
     """Create a PPTX with the image as a single slide."""
     prs = Presentation()
     slide_layout = prs.slide_layouts[6]
     slide = prs.slides.add_slide(slide_layout)
-    img = Image.open(io.BytesIO(img_bytes))
-    px_w, px_h = img.size
-    dpi = 96.0
-    width_in = px_w / dpi
-    height_in = px_h / dpi
-    prs_w_in = prs.slide_width / 914400.0
-    prs_h_in = prs.slide_height / 914400.0
-    scale = min(prs_w_in / width_in, prs_h_in / height_in)
-    pic_w_in = width_in * scale
-    pic_h_in = height_in * scale
-    left_in = (prs_w_in - pic_w_in) / 2
-    top_in = (prs_h_in - pic_h_in) / 2
-    slide.shapes.add_picture(io.BytesIO(img_bytes), Inches(left_in), Inches(top_in), width=Inches(pic_w_in), height=Inches(pic_h_in))
+    img_stream = io.BytesIO(img_bytes)
+    dims = _probe_dims(img_bytes)
+    if dims is None:
+        # other formats (webp, ...): PIL only parses the header here
+        dims = Image.open(img_stream).size
+        img_stream.seek(0)
+    px_w, px_h = dims
+    add_fitted_picture(slide, img_stream, px_w, px_h, prs.slide_width, prs.slide_height)
     out = io.BytesIO()
     prs.save(out)
     out.seek(0)
@@ -138,23 +189,10 @@ def text_to_image_bytes(text: str, max_width=1200, font_path=None, font_size=18)
             font = ImageFont.load_default()
     except Exception:
         font = ImageFont.load_default()
-    # simple wrap: measure lines
-    lines = []
-    words = text.split()
-    cur = ""
-    # approximate wrapping by characters (simple)
+    # approximate wrapping by characters (simple); long words stay whole
     approx_chars_per_line = 80
-    for w in words:
-        if len(cur) + 1 + len(w) > approx_chars_per_line:
-            lines.append(cur)
-            cur = w
-        else:
-            if cur:
-                cur += ' ' + w
-            else:
-                cur = w
-    if cur:
-        lines.append(cur)
+    lines = textwrap.wrap(' '.join(text.split()), width=approx_chars_per_line,
+                          break_long_words=False, break_on_hyphens=False)
     # fallback if no words (empty file)
     if not lines:
         lines = ['']
@@ -165,11 +203,9 @@ def text_to_image_bytes(text: str, max_width=1200, font_path=None, font_size=18)
     img_w = max_width
     image = Image.new('RGB', (img_w, img_h), color='white')
     draw = ImageDraw.Draw(image)
-    y = 20
-    x = 20
-    for line in lines:
-        draw.text((x, y), line, fill='black', font=font)
-        y += line_height
+    # one multiline_text call; Pillow steps lines by the height of "A" + spacing
+    spacing = line_height - draw.textbbox((0, 0), 'A', font=font)[3]
+    draw.multiline_text((20, 20), '\n'.join(lines), fill='black', font=font, spacing=spacing)
     buf = io.BytesIO()
     image.save(buf, format='PNG')
     buf.seek(0)
@@ -184,6 +220,11 @@ def convert_supported_file_to_pptx_bytes(file_path: str, ext: str, tmpdir: str):
     tmpdir is a working folder for temporary outputs.
     """
     try:
+        if ext == '.pptx':
+            # already a presentation: keep it as is (and editable)
+            with open(file_path, 'rb') as f:
+                return f.read()
+
         if ext == '.pdf':
             with open(file_path, 'rb') as f:
                 pdf_bytes = f.read()
@@ -200,7 +241,7 @@ def convert_supported_file_to_pptx_bytes(file_path: str, ext: str, tmpdir: str):
             img_b = text_to_image_bytes(txt)
             return image_bytes_to_pptx_bytes(img_b, img_name=os.path.basename(file_path))
 
-        if ext in {'.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx', '.html', '.htm'}:
+        if ext in {'.doc', '.docx', '.xls', '.xlsx', '.ppt', '.html', '.htm'}:
             # Convert to PDF first using soffice (LibreOffice) or wkhtmltopdf for HTML if available
             if ext in {'.html', '.htm'} and WKHTMLTOPDF_BIN:
                 out_pdf = os.path.join(tmpdir, os.path.splitext(os.path.basename(file_path))[0] + '.pdf')
@@ -242,84 +283,122 @@ def convert_all_to_ppt():
     filename = uploaded.filename or 'upload'
     ext = Path(filename).suffix.lower()
 
-    # Working temporary directory (unique)
+    # Working temporary directory (unique). The result ZIP is sent from
+    # disk, so it is removed when the response closes
     base_tmp = tempfile.mkdtemp(prefix='convert_all_')
     try:
-        if ext == '.zip':
-            zip_path = os.path.join(base_tmp, 'uploaded.zip')
-            uploaded.save(zip_path)
-            results = []  # list of (name, bytes)
-            with zipfile.ZipFile(zip_path, 'r') as zf:
-                namelist = zf.namelist()
-                for member in namelist:
-                    # skip directories
-                    if member.endswith('/'):
-                        continue
-                    member_ext = Path(member).suffix.lower()
-                    if member_ext not in SUPPORTED_SINGLE:
-                        # skip unsupported — but could add as notice
-                        continue
-                    # extract member to temp file
-                    safe_name = os.path.basename(member)
-                    out_path = os.path.join(base_tmp, safe_name)
-                    # ensure target directory exists
-                    os.makedirs(os.path.dirname(out_path), exist_ok=True)
-                    with open(out_path, 'wb') as out_f:
-                        out_f.write(zf.read(member))
-                    try:
-                        pptx_bytes = convert_supported_file_to_pptx_bytes(out_path, member_ext, base_tmp)
-                        out_ppt_name = os.path.splitext(safe_name)[0] + '.pptx'
-                        results.append((out_ppt_name, pptx_bytes))
-                    except Exception as e:
-                        # on error produce a small txt explaining failure
-                        tb = traceback.format_exc()
-                        err_name = os.path.splitext(safe_name)[0] + '_error.txt'
-                        results.append((err_name, f'Failed to convert {member}: {str(e)}\n\n{tb}'.encode('utf-8')))
-
-            if not results:
-                return jsonify({'error': 'No supported files found inside ZIP.'}), 400
-
-            # If only one pptx result, return it directly
-            if len(results) == 1 and results[0][0].lower().endswith('.pptx'):
-                name, data = results[0]
-                resp = make_response(data)
-                resp.headers.set('Content-Type', 'application/vnd.openxmlformats-officedocument.presentationml.presentation')
-                resp.headers.set('Content-Disposition', f'attachment; filename="{name}"')
-                return resp
-
-            # else create zip
-            out_zip = io.BytesIO()
-            with zipfile.ZipFile(out_zip, 'w', compression=zipfile.ZIP_DEFLATED) as zout:
-                for name, data in results:
-                    zout.writestr(name, data)
-            out_zip.seek(0)
-            resp = make_response(out_zip.read())
-            resp.headers.set('Content-Type', 'application/zip')
-            resp.headers.set('Content-Disposition', 'attachment; filename="converted_ppts.zip"')
-            return resp
+        resp = make_response(convert_upload_to_ppt(uploaded, filename, ext, base_tmp))
+    except BaseException:
+        shutil.rmtree(base_tmp, ignore_errors=True)
+        raise
+    resp.call_on_close(lambda: shutil.rmtree(base_tmp, ignore_errors=True))
+    return resp
 
-        else:
-            # single file
-            save_path = os.path.join(base_tmp, filename)
-            uploaded.save(save_path)
-            if ext not in SUPPORTED_SINGLE:
-                return jsonify({'error': f'Unsupported file type: {ext}'}), 400
+PPTX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.presentationml.presentation'
+
+def send_pptx(path: str, download_name: str):
+    """File response for a .pptx on disk (under the request's base_tmp)."""
+    return send_file(path, mimetype=PPTX_MIMETYPE, as_attachment=True, download_name=download_name)
+
+def convert_upload_to_ppt(uploaded, filename: str, ext: str, base_tmp: str):
+    """Save the upload into base_tmp, convert it and build the response."""
+    if ext == '.zip':
+        zip_path = os.path.join(base_tmp, 'uploaded.zip')
+        save_upload(uploaded, zip_path)
+        results = []  # list of (name, bytes)
+        members = []  # (member, safe_name, out_path, ext)
+        with zipfile.ZipFile(zip_path, 'r') as zf:
+            namelist = zf.namelist()
+            for i, member in enumerate(namelist):
+                # skip directories
+                if member.endswith('/'):
+                    continue
+                member_ext = Path(member).suffix.lower()
+                if member_ext not in SUPPORTED_SINGLE:
+                    # skip unsupported — but could add as notice
+                    continue
+                # extract member to its own temp folder so equal names don't clash
+                safe_name = os.path.basename(member)
+                out_path = os.path.join(base_tmp, 'in', str(i), safe_name)
+                os.makedirs(os.path.dirname(out_path), exist_ok=True)
+                with zf.open(member) as src_f, open(out_path, 'wb') as out_f:
+                    shutil.copyfileobj(src_f, out_f, 1024 * 1024)
+                members.append((member, safe_name, out_path, member_ext))
+
+        # Office documents (and HTML when wkhtmltopdf is missing) all go
+        # through LibreOffice: convert them to PDF with one launch per worker
+        office_exts = {'.doc', '.docx', '.xls', '.xlsx', '.ppt'}
+        if not WKHTMLTOPDF_BIN:
+            office_exts |= {'.html', '.htm'}
+        office_paths = [m[2] for m in members if m[3] in office_exts]
+        batches = [office_paths[i::CONVERT_WORKERS] for i in range(CONVERT_WORKERS)]
+
+        def convert_member(entry):
+            member, safe_name, out_path, member_ext = entry
+            # each member's own folder doubles as its working dir
+            workdir = os.path.dirname(out_path)
             try:
-                pptx_bytes = convert_supported_file_to_pptx_bytes(save_path, ext, base_tmp)
-                out_name = os.path.splitext(filename)[0] + '.pptx'
-                resp = make_response(pptx_bytes)
-                resp.headers.set('Content-Type', 'application/vnd.openxmlformats-officedocument.presentationml.presentation')
-                resp.headers.set('Content-Disposition', f'attachment; filename="{out_name}"')
-                return resp
+                if pdf_paths.get(out_path):
+                    pptx_bytes = convert_supported_file_to_pptx_bytes(pdf_paths[out_path], '.pdf', workdir)
+                else:
+                    pptx_bytes = convert_supported_file_to_pptx_bytes(out_path, member_ext, workdir)
+                return os.path.splitext(safe_name)[0] + '.pptx', pptx_bytes
             except Exception as e:
+                # on error produce a small txt explaining failure
                 tb = traceback.format_exc()
-                return jsonify({'error': f'Conversion failed: {str(e)}', 'trace': tb}), 500
-    finally:
-        # cleanup
+                err_name = os.path.splitext(safe_name)[0] + '_error.txt'
+                return err_name, f'Failed to convert {member}: {str(e)}\n\n{tb}'.encode('utf-8')
+
+        pdf_paths = {}
+        with ThreadPoolExecutor(max_workers=CONVERT_WORKERS) as pool:
+            batch_futures = [
+                pool.submit(run_soffice_convert_many, batch, os.path.join(base_tmp, 'pdf', str(i)))
+                for i, batch in enumerate(batches) if batch
+            ]
+            for fut in batch_futures:
+                pdf_paths.update(fut.result())
+            results.extend(pool.map(convert_member, members))
+
+        if not results:
+            return jsonify({'error': 'No supported files found inside ZIP.'}), 400
+
+        # If only one pptx result, return it directly
+        if len(results) == 1 and results[0][0].lower().endswith('.pptx'):
+            name, data = results[0]
+            out_path = os.path.join(base_tmp, 'converted.pptx')
+            with open(out_path, 'wb') as f:
+                f.write(data)
+            return send_pptx(out_path, name)
+
+        # else create zip
+        out_zip_path = os.path.join(base_tmp, 'converted_ppts.zip')
+        with zipfile.ZipFile(out_zip_path, 'w', compression=zipfile.ZIP_DEFLATED) as zout:
+            for name, data in results:
+                # .pptx is already a deflated zip; only the error notes shrink
+                compress = zipfile.ZIP_STORED if name.endswith('.pptx') else zipfile.ZIP_DEFLATED
+                zout.writestr(name, data, compress_type=compress)
+        return send_file(out_zip_path, mimetype='application/zip',
+                         as_attachment=True, download_name='converted_ppts.zip')
+
+    else:
+        # single file
+        save_path = os.path.join(base_tmp, filename)
+        save_upload(uploaded, save_path)
+        if ext not in SUPPORTED_SINGLE:
+            return jsonify({'error': f'Unsupported file type: {ext}'}), 400
+        out_name = os.path.splitext(filename)[0] + '.pptx'
+        if ext == '.pptx':
+            # already a presentation: send the upload back as is
+            return send_pptx(save_path, out_name)
         try:
-            shutil.rmtree(base_tmp)
-        except Exception:
-            pass
+            pptx_bytes = convert_supported_file_to_pptx_bytes(save_path, ext, base_tmp)
+            out_path = os.path.join(base_tmp, 'converted.pptx')
+            with open(out_path, 'wb') as f:
+                f.write(pptx_bytes)
+            return send_pptx(out_path, out_name)
+        except Exception as e:
+            tb = traceback.format_exc()
+            return jsonify({'error': f'Conversion failed: {str(e)}', 'trace': tb}), 500
 
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
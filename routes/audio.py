@@ -1,5 +1,5 @@
 # Audio routes - Endpoints for audio processing operations
-from flask import Blueprint, request, jsonify
+from flask import Blueprint
 import os
 import sys
 
@@ -9,11 +9,17 @@ audio_bp = Blueprint("audio", __name__)
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 
-@audio_bp.route("/download-audio-batch", methods=["POST", "OPTIONS"])
+@audio_bp.route("/download-audio-batch", methods=["POST"])
 def download_audio_batch():
     """Extract audio from video URLs (single or batch from file)"""
-    if request.method == 'OPTIONS':
-        return jsonify({"status": "ok"}), 200
     # Lazy load heavy module
     from audioextractor import download_audio_batch as _download_audio_original
     return _download_audio_original()
+
+
+@audio_bp.route("/download-audio-batch-stream", methods=["POST"])
+def download_audio_batch_stream():
+    """Extract audio from a raw (non-multipart) file upload streamed to disk"""
+    # Lazy load heavy module
+    from audioextractor import download_audio_batch_stream as _download_audio_stream
+    return _download_audio_stream()
@@ -1,5 +1,5 @@
 # Conversion routes - Endpoints for file conversion operations
-from flask import Blueprint, request, jsonify
+from flask import Blueprint
 import os
 import sys
 
@@ -11,11 +11,9 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 # Lazy loading for heavy modules
 
 
-@conversion_bp.route("/file-pdf", methods=["POST", "OPTIONS"])
+@conversion_bp.route("/file-pdf", methods=["POST"])
 def file_pdf():
     """Convert various file formats to PDF"""
-    if request.method == 'OPTIONS':
-        return jsonify({"status": "ok"}), 200
     from filestopdf import file_pdf as _file_pdf_original
     return _file_pdf_original()
 
@@ -27,19 +25,15 @@ def status():
     return _status_original()
 
 
-@conversion_bp.route("/convert-all-to-ppt", methods=["POST", "OPTIONS"])
+@conversion_bp.route("/convert-all-to-ppt", methods=["POST"])
 def convert_to_ppt():
     """Convert files to PowerPoint format"""
-    if request.method == 'OPTIONS':
-        return jsonify({"status": "ok"}), 200
     from filestoppt import convert_all_to_ppt as _to_ppt_original
     return _to_ppt_original()
 
 
-@conversion_bp.route("/compress", methods=["POST", "OPTIONS"])
+@conversion_bp.route("/compress", methods=["POST"])
 def compress():
     """Compress various file types"""
-    if request.method == 'OPTIONS':
-        return jsonify({"status": "ok"}), 200
     from filescompressor import compress_endpoint as _compress_original
     return _compress_original()
@@ -13,7 +13,7 @@ from services.image_service import (
 image_bp = Blueprint("image", __name__)
 
 
-@image_bp.route("/img-compress", methods=["POST", "OPTIONS"])
+@image_bp.route("/img-compress", methods=["POST"])
 def img_compress():
     """
     POST form-data:
@@ -24,9 +24,6 @@ def img_compress():
       - Single compressed image if single image uploaded
       - ZIP file with compressed images if ZIP file uploaded
     """
-    if request.method == 'OPTIONS':
-        return jsonify({"status": "ok"}), 200
-        
     if "file" not in request.files:
         return jsonify({"error": "No file provided"}), 400
 
@@ -144,49 +141,37 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 # This reduces startup memory footprint
 
 # Wrap the existing functions to keep them in this blueprint
-@image_bp.route("/img-jpg", methods=["POST", "OPTIONS"])
+@image_bp.route("/img-jpg", methods=["POST"])
 def img_jpg():
-    if request.method == 'OPTIONS':
-        return jsonify({"status": "ok"}), 200
     from imgtojpg import img_to_jpg as _img_to_jpg_original
     return _img_to_jpg_original()
 
 
-@image_bp.route("/img-png", methods=["POST", "OPTIONS"])
+@image_bp.route("/img-png", methods=["POST"])
 def img_png():
-    if request.method == 'OPTIONS':
-        return jsonify({"status": "ok"}), 200
     from imgtopng import img_to_png as _img_to_png_original
     return _img_to_png_original()
 
 
-@image_bp.route("/img-webp", methods=["POST", "OPTIONS"])
+@image_bp.route("/img-webp", methods=["POST"])
 def img_webp():
-    if request.method == 'OPTIONS':
-        return jsonify({"status": "ok"}), 200
     from imgtowebp import img_webp as _img_webp_original
     return _img_webp_original()
 
 
-@image_bp.route("/upscale", methods=["POST", "OPTIONS"])
+@image_bp.route("/upscale", methods=["POST"])
 def upscale():
-    if request.method == 'OPTIONS':
-        return jsonify({"status": "ok"}), 200
     from upscaleimg import upscale_zip_or_image as _upscale_original
     return _upscale_original()
 
 
-@image_bp.route("/remove-imgbg", methods=["POST", "OPTIONS"])
+@image_bp.route("/remove-imgbg", methods=["POST"])
 def remove_imgbg():
-    if request.method == 'OPTIONS':
-        return jsonify({"status": "ok"}), 200
     from removeimgbg import remove_imgbg_endpoint as _remove_bg_original
     return _remove_bg_original()
 
 
-@image_bp.route("/watermark-imgvideo", methods=["POST", "OPTIONS"])
+@image_bp.route("/watermark-imgvideo", methods=["POST"])
 def watermark_imgvideo():
-    if request.method == 'OPTIONS':
-        return jsonify({"status": "ok"}), 200
     from watermarkimgvideo import watermark_imgvideo_endpoint as _watermark_original
     return _watermark_original()
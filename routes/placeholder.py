@@ -13,14 +13,10 @@ def hex_to_rgb(hex_color):
     return tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
 
 
-@placeholder_bp.route('/generate-placeholder', methods=['POST', 'OPTIONS'])
+@placeholder_bp.route('/generate-placeholder', methods=['POST'])
 def generate_placeholder():
     """Generate a placeholder image with custom dimensions and styling."""
     
-    # Handle CORS preflight
-    if request.method == 'OPTIONS':
-        return '', 204
-    
     try:
         data = request.get_json()
         
@@ -5,7 +5,7 @@ from qr_generator import generate_qr_code
 qr_bp = Blueprint("qr", __name__)
 
 
-@qr_bp.route("/generate-qr", methods=["POST", "OPTIONS"])
+@qr_bp.route("/generate-qr", methods=["POST"])
 def generate_qr():
     """
     Generate QR code endpoint.
@@ -19,10 +19,6 @@ def generate_qr():
         "background": "#ffffff"
     }
     """
-    # Handle preflight OPTIONS request
-    if request.method == 'OPTIONS':
-        return jsonify({"status": "ok"}), 200
-    
     try:
         # Get JSON data from request
         req_data = request.get_json()
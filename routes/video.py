@@ -1,5 +1,5 @@
 # Video routes - Endpoints for video processing operations
-from flask import Blueprint, request, jsonify
+from flask import Blueprint
 import os
 import sys
 
@@ -11,19 +11,29 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 # Lazy loading for heavy modules
 
 
-@video_bp.route("/video-upscale", methods=["POST", "OPTIONS"])
+@video_bp.route("/video-upscale", methods=["POST"])
 def video_upscale():
     """Upscale video using FFmpeg"""
-    if request.method == 'OPTIONS':
-        return jsonify({"status": "ok"}), 200
     from videoupscale import video_upscale as _video_upscale_original
     return _video_upscale_original()
 
 
-@video_bp.route("/download-video-batch", methods=["POST", "OPTIONS"])
+@video_bp.route("/download-video-batch", methods=["POST"])
 def download_video_batch():
     """Download videos from URLs (single or batch from file)"""
-    if request.method == 'OPTIONS':
-        return jsonify({"status": "ok"}), 200
     from downloadvideolink_batch import download_video_batch as _download_batch_original
     return _download_batch_original()
+
+
+@video_bp.route("/download-video-batch/stream", methods=["POST"])
+def download_video_batch_stream():
+    """Download videos from URLs, reporting progress as Server-Sent Events"""
+    from downloadvideolink_batch import download_video_batch_stream as _download_batch_stream
+    return _download_batch_stream()
+
+
+@video_bp.route("/downloads/<token>", methods=["GET"])
+def download_batch_result(token):
+    """Fetch the video/ZIP produced by a streamed batch"""
+    from downloadvideolink_batch import download_batch_result as _download_batch_result
+    return _download_batch_result(token)
@@ -0,0 +1,13 @@
+import pytest
+
+batch = pytest.importorskip("downloadvideolink_batch")
+
+
+def test_balanced_paren_is_kept():
+    url = "https://en.wikipedia.org/wiki/Foo_(bar)"
+    assert batch._canonical_url(url) == url
+
+
+def test_unbalanced_trailing_punctuation_is_stripped():
+    assert batch._canonical_url("https://Example.com/a).") == "https://example.com/a"
+    assert batch._canonical_url("https://example.com/Foo_(bar)),") == "https://example.com/Foo_(bar)"
@@ -1,8 +1,14 @@
 # Shared utility functions for file handling and validation
 
+import contextlib
 import os
+import queue
 import re
-from typing import Set
+import shutil
+import tempfile
+import zipfile
+from pathlib import Path
+from typing import Iterable, Iterator, Set, Tuple
 
 
 def sanitize_filename(filename: str) -> str:
@@ -52,3 +58,97 @@ def get_mimetype_from_extension(ext: str) -> str:
         '.ogg': 'audio/ogg',
     }
     return mime_map.get(ext.lower(), 'application/octet-stream')
+
+
+class _ZipStreamBuffer:
+    """Write-only, unseekable sink that zipfile writes into and we drain."""
+
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+
+    def write(self, data):
+        if data:
+            self._chunks.append(bytes(data))
+            self._offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._offset
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_zip(files: Iterable[Tuple[str, str]],
+               compression: int = zipfile.ZIP_STORED,
+               chunk_size: int = 1024 * 1024) -> Iterator[bytes]:
+    """
+    Yield a ZIP archive of (path, arcname) pairs chunk by chunk.
+
+    Nothing is written to disk and the first bytes go out before the archive
+    is complete. Defaults to ZIP_STORED since the callers zip media that is
+    already compressed.
+    """
+    sink = _ZipStreamBuffer()
+    with zipfile.ZipFile(sink, 'w', compression=compression) as zf:
+        for path, arcname in files:
+            zinfo = zipfile.ZipInfo.from_file(path, arcname, strict_timestamps=False)
+            zinfo.compress_type = compression
+            with open(path, 'rb') as src, zf.open(zinfo, 'w') as dest:
+                while True:
+                    chunk = src.read(chunk_size)
+                    if not chunk:
+                        break
+                    dest.write(chunk)
+                    data = sink.drain()
+                    if data:
+                        yield data
+            data = sink.drain()
+            if data:
+                yield data
+    # Central directory
+    data = sink.drain()
+    if data:
+        yield data
+
+
+def save_upload(file_storage, dest_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """
+    Persist a Werkzeug FileStorage to dest_path with a large copy buffer.
+
+    FileStorage.save() uses 16 KiB chunks, but uploads here are often tens
+    of MB, so copy in 1 MiB chunks with unbuffered writes instead.
+    """
+    with open(dest_path, 'wb', buffering=0) as out:
+        shutil.copyfileobj(file_storage.stream, out, length=chunk_size)
+    return dest_path
+
+
+# Idle LibreOffice profile directories, reused across conversions
+_SOFFICE_PROFILES: "queue.SimpleQueue[str]" = queue.SimpleQueue()
+
+
+@contextlib.contextmanager
+def soffice_profile() -> Iterator[str]:
+    """
+    Yield an ``-env:UserInstallation=...`` argument for one soffice run.
+
+    soffice instances sharing a profile hand their work to whichever started
+    first (or fail on its lock), so parallel conversions each need their own.
+    Profiles are pooled rather than deleted so later runs skip initialising
+    a fresh one.
+    """
+    try:
+        path = _SOFFICE_PROFILES.get_nowait()
+    except queue.Empty:
+        path = tempfile.mkdtemp(prefix='soffice_profile_')
+    try:
+        yield '-env:UserInstallation=' + Path(path).as_uri()
+    finally:
+        _SOFFICE_PROFILES.put(path)